@@ -1,10 +1,20 @@
 """
 CODATA constants.
+
+Besides the symbolic unit expressions, the registry :data:`constants`
+holds each constant with its numeric SI value, its dimension and its
+standard uncertainty, computed once at import. Substituting the
+:attr:`Constant.quantity` of a constant (see :func:`patchUnits`) lets
+derivations work with plain floats instead of the symbolic expression.
 """
 
+import collections
+
 import sympy.physics.units as u
 import sympy as sp
 
+from Evaluation import Units
+
 e = u.eV / u.V
 me = 910938215*u.kg*1/(10**39)
 mp = 1672621637*u.kg*1/(10**36)
@@ -13,15 +23,65 @@ rydberg = ((e**2/(4*sp.pi*u.electric_constant))**2*(2*sp.pi**2*me/(u.planck**3*u
 planck2pi = u.planck / (2*sp.pi)
 rydberg_energy = e**4*me/(2*(4*sp.pi*u.electric_constant*planck2pi)**2)
 
+
+class Constant(collections.namedtuple("Constant",
+        ["name", "expr", "value", "unit", "uncertainty"])):
+    """
+    A constant *name* with its symbolic unit expression *expr*, the
+    float *value* in SI base units, the :class:`Units.UnitVector` *unit*
+    of its dimension and the standard *uncertainty* in SI base units.
+    """
+    __slots__ = ()
+
+    @property
+    def unitExpr(self):
+        """The SI base units of the constant as sympy expression."""
+        return self.unit.toExpr()
+
+    @property
+    def quantity(self):
+        """The numeric value of the constant including its unit."""
+        return self.value * self.unitExpr
+
+    @property
+    def relativeUncertainty(self):
+        return self.uncertainty / self.value
+
+
+def _constant(name, expr, uncertainty):
+    vector = Units.parse(expr)
+    return Constant(name, expr, vector.scale,
+        Units.UnitVector(1.0, vector.exponents), uncertainty)
+
+def _buildConstants():
+    # CODATA 2006 values with their standard uncertainties; the derived
+    # constants get the published uncertainties, as propagating those of
+    # the measured constants would ignore their strong correlations
+    constants = [
+        _constant("e", e, 4.0e-27),
+        _constant("me", me, 4.5e-38),
+        _constant("mp", mp, 8.3e-35),
+        _constant("mn", mn, 7.4e-35),
+        _constant("planck", u.planck, 3.3e-41),
+        _constant("rydberg", rydberg, 7.3e-5),
+        _constant("planck2pi", planck2pi, 5.3e-42),
+        _constant("rydberg_energy", rydberg_energy, 1.1e-25),
+    ]
+    return dict((constant.name, constant) for constant in constants)
+
+constants = _buildConstants()
+"""Registry of the :class:`Constant` objects by name."""
+
 def patchUnits(u):
-    def patchUnits():
-        u.e = e
-        u.me = me
-        u.mp = mp
-        u.mn = mn
-        u.rydberg = rydberg
-        u.planck2pi = planck2pi
-        u.rydberg_energy = rydberg_energy
+    def patchUnits(numeric=False):
+        """
+        Add the constants to :mod:`sympy.physics.units`. If *numeric*
+        is *True*, the numeric :attr:`Constant.quantity` is used instead
+        of the symbolic expression of each constant.
+        """
+        for name in ("e", "me", "mp", "mn", "rydberg", "planck2pi", "rydberg_energy"):
+            constant = constants[name]
+            setattr(u, name, constant.quantity if numeric else constant.expr)
     return patchUnits
 patchUnits = patchUnits(u)
 
@@ -6,19 +6,110 @@ import abc
 import sys
 import itertools
 
-from Document.TablePrinter import TablePrinter
+import numpy as np
+
+from Document.TablePrinter import TablePrinter, BlockWriter, BLOCK_ROWS
 
 class GnuplotPrinter(TablePrinter):
-    def __init__(self, columnKeys, alignment=None, precision=6, **kwargs):
+    """
+    Print columns as data file for gnuplot. Each column is followed by
+    its attachments (or, with *merge*, by their quadratic sum) as
+    separate data columns.
+
+    If *binary* is true, the values are written as little-endian
+    float64 records instead of text. This is exact and much faster to
+    read for large plots; use :meth:`binarySpec` with the columns
+    returned by calling the printer to get the matching `binary` and
+    `using` specification for the plot command.
+
+    If *decimate* is set, tables printed by calling the printer are
+    reduced to about that many rows with :meth:`Table.Table.decimate`
+    using *decimation*, taking the first two columns as `x` and `y`.
+    """
+
+    def __init__(self, columnKeys, alignment=None, precision=6, binary=False,
+            decimate=None, decimation="lttb", **kwargs):
+        kwargs.setdefault("error_joiner", " ")
         super(GnuplotPrinter, self).__init__(columnKeys, **kwargs)
         self._format = "{{0:.{0}f}}".format(precision)
         self._secondaryFormat = "{{0:.{0}f}}".format(precision)
         self._alignment = alignment or 'r' * len(columnKeys)
+        self._binary = binary
+        self._decimate = decimate
+        self._decimation = decimation
+
+    def columns(self, table):
+        if self._decimate is not None and len(self._columnKeys) >= 2:
+            table = table.decimate(
+                self._columnKeys[0], self._columnKeys[1], self._decimate,
+                method=self._decimation, columnKeys=self._columnKeys)
+        return super(GnuplotPrinter, self).columns(table)
+
+    def __call__(self, table, file=sys.stdout):
+        """
+        Print the columns of *table* to *file* and return the list of
+        the printed (possibly decimated) columns, e.g. for
+        :meth:`binarySpec` or :meth:`fields`.
+        """
+        columns = self.columns(table)
+        self.printColumns(columns, file=file)
+        return columns
+
+    def fields(self, columns):
+        """
+        Return the list of the data columns written for *columns*, in
+        order. Each entry is a tuple `(symbol, key)`, where *key* is
+        *None* for the values, the attachment key for an attachment or
+        `"merged"` for merged attachments.
+        """
+        fields = []
+        for column in columns:
+            fields.append((column.symbol, None))
+            if self._merge:
+                fields.append((column.symbol, "merged"))
+            else:
+                fields.extend((column.symbol, key) for key in self.attachments)
+        return fields
+
+    def binarySpec(self, columns, using=None):
+        """
+        Return the gnuplot data file modifiers for the binary output of
+        *columns*, e.g. `binary format="%3float64" endian=little using
+        1:2:3`. *using* may be a sequence of (one-based) data column
+        numbers; by default, all data columns are used in order.
+        """
+        count = len(self.fields(columns))
+        using = using or range(1, count + 1)
+        return 'binary format="%{0}float64" endian=little using {1}'.format(
+            count, ":".join(map(unicode, using)))
 
-    def formatField(self, field):
-        return super(GnuplotPrinter, self).formatField(field, errorJoiner=" ")
+    def _records(self, columns):
+        """
+        Yield blocks of records as two-dimensional float arrays with one
+        row per record and one column per field (see :meth:`fields`).
+        """
+        arrays = [self.columnArrays(column) for column in columns]
+        length = min(len(values) for values, _ in arrays) if arrays else 0
+        for start in range(0, length, BLOCK_ROWS):
+            block = slice(start, start + BLOCK_ROWS)
+            fields = []
+            for values, errors in arrays:
+                fields.append(values[block])
+                errors = [error[block] for error in errors]
+                if self._merge:
+                    merged = np.zeros(len(fields[-1]))
+                    for error in errors:
+                        merged += error**2
+                    fields.append(np.sqrt(merged))
+                else:
+                    fields.extend(errors)
+            yield np.column_stack(fields)
 
     def printColumns(self, columns, file=sys.stdout, encoding="utf-8"):
-        tableData = itertools.izip(*columns)
-        for row in tableData:
-            print(' '.join(map(self.formatField, row)).encode(encoding), file=file, end=b'\n')
+        if self._binary:
+            for records in self._records(columns):
+                file.write(records.astype("<f8").tobytes())
+            return
+        with BlockWriter(file, encoding) as writer:
+            for row in self.iterRows(columns):
+                writer.write(' '.join(row) + '\n')
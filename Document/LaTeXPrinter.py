@@ -7,43 +7,225 @@ import sys
 import itertools
 import functools
 
-from Document.TablePrinter import TablePrinter
+from Document.TablePrinter import TablePrinter, BlockWriter, BLOCK_ROWS
+import numpy as np
+
 import Evaluation.StatUtils as StatUtils
+import utils
+
+SUMMARY_ROWS = ("N", "mean", "std", "min", "max")
+"""Labels of the rows of summary tables, see :func:`summarize`."""
+
+def table_lines(spec, header, rows, booktabs=True, longtable=False):
+    """
+    Yield the lines of a LaTeX table with the column specification
+    *spec*, the *header* line and the iterable of body lines *rows*.
+    The header and body lines must include the row terminator.
+
+    If *longtable* is true, a `longtable` environment (requires
+    ``\\usepackage{longtable}``) is produced instead of a `tabular`.
+    LaTeX breaks it across pages in chunks and repeats the header on
+    each page, which keeps very large tables manageable.
+    """
+    env = "longtable" if longtable else "tabular"
+    head = [header]
+    if booktabs:
+        head = [r"\toprule"] + head + [r"\midrule"]
+
+    yield r"\begin{" + env + "}{" + spec + "}"
+    for line in head:
+        yield line
+    if longtable:
+        yield r"\endfirsthead"
+        for line in head:
+            yield line
+        yield r"\endhead"
+        if booktabs:
+            yield r"\bottomrule"
+        yield r"\endlastfoot"
+
+    for row in rows:
+        yield row
+
+    if booktabs and not longtable:
+        yield r"\bottomrule"
+    yield r"\end{" + env + "}"
+
+def write_pages(write_page, length, path_pattern, rows_per_page):
+    """
+    Split *length* rows into pages of at most *rows_per_page* rows and
+    call *write_page* with an open binary file and the slice of the rows
+    for each page. The file names are made by formatting *path_pattern*
+    with the page number, starting at 1.
+
+    Return the list of the written file names, e.g. to `\\input` them.
+    """
+    paths = []
+    for page, start in enumerate(range(0, length, rows_per_page), 1):
+        path = path_pattern.format(page)
+        with open(path, "wb") as file:
+            write_page(file, slice(start, start + rows_per_page))
+        paths.append(path)
+    return paths
+
+def summarize(values):
+    """
+    Aggregate the float array *values* into the rows of a summary table
+    (see :data:`SUMMARY_ROWS`). Return a list of `(label, value,
+    error)` tuples; *error* is *None* except for the mean, which gets
+    its standard deviation.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        nan = float("nan")
+        return list(zip(SUMMARY_ROWS,
+            [0, nan, nan, nan, nan],
+            [None, nan, None, None, None]))
+    stats = StatUtils.Accumulator.from_array(values)
+    return list(zip(SUMMARY_ROWS,
+        [len(values), float(stats.mean), float(stats.stddev), values.min(), values.max()],
+        [None, float(stats.stddev_of_mean), None, None, None]))
 
 class LaTeXPrinter(TablePrinter):
-    def __init__(self, columnKeys, alignment=None, precision=6, **kwargs):
+    """
+    Print columns into a booktabs `tabular` with fixed *precision*.
+
+    If *longtable* is true, a `longtable` is printed instead, see
+    :func:`table_lines`. If *summary* is true, only the aggregated
+    rows of :func:`summarize` are printed instead of all rows.
+    """
+
+    def __init__(self, columnKeys, alignment=None, precision=6,
+            longtable=False, summary=False, **kwargs):
         super(LaTeXPrinter, self).__init__(columnKeys, **kwargs)
         self._format = "{{0:.{0}f}}".format(precision)
         self._secondaryFormat = "{{0:.{0}f}}".format(precision)
         self._alignment = alignment or 'r' * len(columnKeys)
-
-    def printColumns(self, columns, file=sys.stdout, encoding="utf-8"):
-
-        tableData = itertools.izip(*columns)
-        for row in tableData:
-            print(' '.join(map(self.formatField, row)).encode(encoding), file=file)
+        self._longtable = longtable
+        self._summary = summary
 
     def siunitx_encode(self, unitexpr):
         # no, thats not perl
         return ("\\"+unitexpr.replace("*", "\\").replace("/", "\\per\\"))\
                             .replace("\\1", "")
 
-    def printColumns(self, columns, file=sys.stdout, encoding="utf-8"):
-        print(r'\begin{{tabular}}{{{0}}}'.format(self._alignment).encode(encoding), file=file)
+    def _header(self, columns):
+        return ' & '.join('${0}\,\,[\si{{{1}}}]$'.format(self.map_symbol(str(column.symbol).decode("utf-8")), self.siunitx_encode(str(column.unit).decode("utf-8"))) for column in columns) + '\\\\'
+
+    def _summaryLines(self, columns):
+        rows = [[label] for label in SUMMARY_ROWS]
+        for column in columns:
+            for cells, (label, value, error) in zip(rows, summarize(column.dataArray())):
+                if label == "N":
+                    cells.append("{}".format(value))
+                    continue
+                cell = self._format.format(value)
+                if error is not None:
+                    cell += self._error_joiner + self._secondaryFormat.format(error)
+                cells.append(cell)
+        return table_lines(
+            'l' + self._alignment,
+            ' & ' + self._header(columns),
+            (' & '.join(cells) + '\\\\' for cells in rows),
+            longtable=self._longtable)
 
-        print(r'\toprule'.encode(encoding), file=file)
-        print(' & '.join('${0}\,\,[\si{{{1}}}]$'.format(self.map_symbol(str(column.symbol).decode("utf-8")), self.siunitx_encode(str(column.unit).decode("utf-8"))) for column in columns).encode(encoding), end=b'\\\\\n', file=file)
-        print(r'\midrule'.encode(encoding), file=file)
-        tableData = itertools.izip(*columns)
-        for row in tableData:
-            print(' & '.join(map(self.formatField, row)).encode(encoding), file=file, end=b'')
-            print(r'\\'.encode(encoding), file=file)
-        print(r'\bottomrule'.encode(encoding), file=file)
+    def printColumns(self, columns, file=sys.stdout, encoding="utf-8", rows=None):
+        """
+        Print the table of *columns* to *file*. *rows* may be a slice to
+        print only a range of rows.
+        """
+        if self._summary:
+            lines = self._summaryLines(columns)
+        else:
+            lines = table_lines(
+                self._alignment,
+                self._header(columns),
+                (' & '.join(row) + '\\\\' for row in self.iterRows(columns, rows=rows)),
+                longtable=self._longtable)
+        with BlockWriter(file, encoding) as writer:
+            for line in lines:
+                writer.write(line + '\n')
 
-        print(r'\end{tabular}'.encode(encoding), file=file)
+    def printPages(self, table, pathPattern, rowsPerPage, encoding="utf-8"):
+        """
+        Print the rows of *table* into several files with at most
+        *rowsPerPage* rows each, every one a complete table including
+        the header. See :func:`write_pages` for *pathPattern* and the
+        return value.
+        """
+        columns = self.columns(table)
+        return write_pages(
+            lambda file, rows: self.printColumns(columns, file=file, encoding=encoding, rows=rows),
+            min(map(len, columns)),
+            pathPattern,
+            rowsPerPage)
+
+class TableFormat(object):
+    """
+    Track the widths of the fixed point cells of a siunitx `S` column
+    with *uncertainties* uncertainties per cell, to give its
+    `table-format` option.
+    """
+
+    def __init__(self, uncertainties=0):
+        self.sign = False
+        self.integer = 1
+        self.decimal = 0
+        self.uncertainty = [1] * uncertainties
+
+    def update(self, values, errors=[]):
+        """
+        Widen the format to hold the list of value strings *values* and
+        the lists of uncertainty strings *errors* of a block of cells.
+        """
+        if not len(values):
+            return
+        values = np.array(values, dtype=np.unicode_)
+        signed = np.char.startswith(values, "-")
+        lengths = np.char.str_len(values) - signed
+        dots = np.char.find(values, ".")
+        integer = np.where(dots >= 0, dots - signed, lengths)
+        decimal = np.where(dots >= 0, lengths + signed - dots - 1, 0)
+        self.sign = self.sign or bool(signed.any())
+        self.integer = max(self.integer, int(integer.max()))
+        self.decimal = max(self.decimal, int(decimal.max()))
+        for i, error in enumerate(errors):
+            # siunitx shows uncertainties in compact form, e.g. 1.23(4)
+            digits = np.char.str_len(np.char.lstrip(
+                np.char.replace(np.array(error, dtype=np.unicode_), ".", ""), "0"))
+            self.uncertainty[i] = max(self.uncertainty[i], int(digits.max()))
+
+    def option(self):
+        """
+        Return the `table-format` option, e.g. `table-format=-2.3(2)`.
+        """
+        return "table-format={0}{1}.{2}{3}".format(
+            "-" if self.sign else "",
+            self.integer,
+            self.decimal,
+            "".join("({0})".format(digits) for digits in self.uncertainty))
 
 class siunitxPrinter(object):
-    _dummy_attachment_iter = itertools.repeat(None)
+    """
+    Print the columns *column_keys* of a table as siunitx `S` columns,
+    rounding each value according to its uncertainties taken from the
+    *attachments* (or the single *attachment*). Several uncertainties
+    are printed one after another (e.g. statistical and systematic,
+    which requires siunitx 3).
+
+    If *table_format* is true, the `table-format` of each column is
+    computed while formatting the cells (see :class:`TableFormat`), so
+    that siunitx does not need to measure the cells. All rows are then
+    formatted before the table is written.
+
+    If *longtable* is true, a `longtable` is printed instead of a
+    `tabular`, see :func:`table_lines`. If *summary* is true, only the
+    aggregated rows of :func:`summarize` are printed instead of all
+    rows.
+    """
+
+    # see :attr:`TablePrinter.TablePrinter.formatVersion`
+    formatVersion = 1
 
     def __init__(self, column_keys,
             precision=None,
@@ -53,57 +235,84 @@ class siunitxPrinter(object):
             column_opts={},
             symbol_map={},
             booktabs=True,
+            block_rows=BLOCK_ROWS,
+            longtable=False,
+            summary=False,
+            table_format=False,
             **kwargs):
         super(siunitxPrinter, self).__init__(**kwargs)
         self._column_keys = column_keys
         self._column_precision = column_precision
-        self._attachment = attachment
-        if attachment is None:
-            if len(attachments) > 1:
-                raise ValueError("Sorry, {} only supports only one attachment".format(type(self).__name__))
-            self._attachment = next(iter(attachments))
-        else:
+        if attachment is not None:
             if attachments:
                 raise ValueError("{} attachment must be set by only one of ``attachment`` and ``attachments`` kwargs.".format(type(self).__name__))
+            attachments = [attachment]
+        self._attachments = list(attachments)
         self._column_opts = column_opts
         self._symbol_map = symbol_map
         self._precision = precision
         self._booktabs = booktabs
+        self._block_rows = block_rows
+        self._longtable = longtable
+        self._summary = summary
+        self._table_format = table_format
 
     def get_column_precision(self, column):
         return self._column_precision.get(column.symbol, None) or self._precision
 
-    def _format_column_values(self, column):
+    def _column_arrays(self, column):
+        """
+        Return the tuple `(values, errors)` printed for *column*.
+        *errors* is the list of the arrays of those *attachments* the
+        column has. *values* is a float array, except for exact columns
+        printed without rounding, for which it is the list of the exact
+        values.
+        """
+        errors = [column.attachmentArray(key)
+                  for key in self._attachments if key in column.attachments]
+        if errors:
+            return column.dataArray(), errors
+        if self.get_column_precision(column) is None and not column.numeric:
+            return list(column.data), errors
+        return column.dataArray(), errors
+
+    def _format_column_values(self, column, values, errors):
+        """
+        Return the tuple of the list of value strings and the list of
+        the lists of uncertainty strings of the cells given by *values*
+        and *errors* (or a block of them, see :meth:`_column_arrays`).
+        All cells are rounded and formatted at once.
+        """
         precision = self.get_column_precision(column)
-        if self._attachment is not None:
-            attachment_iter = column.attachments.get(self._attachment, self._dummy_attachment_iter)
+        if errors:
+            return StatUtils.array_multi_error_rounding(
+                values, errors, force_digits=precision)
+        if precision is None:
+            values = list(map("{}".format, utils.toList(values)))
         else:
-            attachment_iter = self._dummy_attachment_iter
-
-        for value, attachment in zip(column.data, attachment_iter):
-            if attachment is not None:
-                yield StatUtils.error_rounding(value, attachment, force_digits=precision)
-            else:
-                yield StatUtils.digit_rounding(value, precision), None
+            values = StatUtils.array_digit_rounding(values, precision)
+        return values, []
 
-    def _format_cell(self, vstr, dvstr):
-        if dvstr is None:
-            return vstr
-        else:
-            return vstr + " +- " + dvstr
+    def _format_cell(self, vstr, *dvstrs):
+        return " +- ".join((vstr,) + dvstrs)
 
     def _siunitx_unit(self, unit):
         # no, thats not perl
         return ("\\"+str(unit).replace("*", "\\").replace("/", "\\per\\"))\
                             .replace("\\1", "")
 
-    def _process_column(self, column):
-        coltype = "S"
-        try:
-            coltype += "[" + self._column_opts[column.symbol] + "]"
-        except KeyError:
-            pass
+    def _column_type(self, column, table_format=None):
+        opts = []
+        if table_format is not None:
+            opts.append(table_format.option())
+        if column.symbol in self._column_opts:
+            opts.append(self._column_opts[column.symbol])
+        if opts:
+            return "S[" + ",".join(opts) + "]"
+        return "S"
 
+    def _process_column(self, column):
+        coltype = self._column_type(column)
         unitstr = self._siunitx_unit(column.unit)
         symb = self._symbol_map.get(str(column.symbol), str(column.symbol))
         if unitstr:
@@ -116,39 +325,99 @@ class siunitxPrinter(object):
                 symb=symb
             )
 
-        return coltype, header, [self._format_cell(v, dv) for v, dv in self._format_column_values(column)]
+        return coltype, header, (column,) + self._column_arrays(column)
 
-    def _process_columns(self, column_dict):
-        return list(map(
-            self._process_column,
-            (column_dict[key] for key in self._column_keys)
-        ))
+    def _format_block(self, column, values, errors, block, table_format=None):
+        values, errors = self._format_column_values(
+            column, values[block], [error[block] for error in errors])
+        if table_format is not None:
+            table_format.update(values, errors)
+        return [self._format_cell(*cell) for cell in zip(values, *errors)]
 
-    def _output_lines(self, table):
-        column_info = list(zip(*self._process_columns(table)))
-        types = column_info[0]
-        headers = column_info[1]
-        iterables = column_info[2]
-
-        yield r"\begin{tabular}{" + "".join(types) + "}"
-
-        if self._booktabs:
-            yield r"\toprule"
+    def columns(self, table):
+        """
+        Return the list of the columns of *table* which are printed.
+        """
+        return [table[key] for key in self._column_keys]
 
-        yield " & ".join(headers) + r" \\"
-
-        if self._booktabs:
-            yield r"\midrule"
+    def _process_columns(self, column_dict):
+        return list(map(self._process_column, self.columns(column_dict)))
 
-        for cells in zip(*iterables):
-            yield " & ".join(cells) + r" \\"
+    def _row_lines(self, sources, rows, table_formats=None):
+        length = min(len(values) for _, values, _ in sources)
+        start, stop, _ = rows.indices(length)
+        table_formats = table_formats or [None] * len(sources)
+        for start in range(start, stop, self._block_rows):
+            block = slice(start, min(start + self._block_rows, stop))
+            iterables = [self._format_block(column, values, errors, block, table_format)
+                         for (column, values, errors), table_format
+                         in zip(sources, table_formats)]
+            for cells in zip(*iterables):
+                yield " & ".join(cells) + r" \\"
 
-        if self._booktabs:
-            yield r"\bottomrule"
+    def _summary_lines(self, sources):
+        rows = [[label] for label in SUMMARY_ROWS]
+        for column, values, _ in sources:
+            precision = self.get_column_precision(column)
+            for cells, (label, value, error) in zip(rows, summarize(values)):
+                if label == "N":
+                    cells.append("{}".format(value))
+                elif error is not None and error > 0:
+                    cells.append(self._format_cell(*StatUtils.error_rounding(
+                        value, error, force_digits=precision)))
+                else:
+                    cells.append(StatUtils.digit_rounding(value, precision))
+        return [" & ".join(cells) + r" \\" for cells in rows]
 
-        yield r"\end{tabular}"
+    def _output_lines(self, table, rows=None):
+        column_info = list(zip(*self._process_columns(table)))
+        types = column_info[0]
+        headers = column_info[1]
+        sources = column_info[2]
 
+        if self._summary:
+            return table_lines(
+                "l" + "".join(types),
+                " & ".join(("{}",) + headers) + r" \\",
+                self._summary_lines(sources),
+                booktabs=self._booktabs,
+                longtable=self._longtable)
+        if self._table_format:
+            table_formats = [TableFormat(len(errors)) for _, _, errors in sources]
+            lines = list(self._row_lines(sources, rows or slice(None), table_formats))
+            types = [self._column_type(column, table_format)
+                     for (column, _, _), table_format in zip(sources, table_formats)]
+        else:
+            lines = self._row_lines(sources, rows or slice(None))
+        return table_lines(
+            "".join(types),
+            " & ".join(headers) + r" \\",
+            lines,
+            booktabs=self._booktabs,
+            longtable=self._longtable)
 
-    def __call__(self, table, file=sys.stdout, encoding="utf-8"):
-        file.write("\n".join(self._output_lines(table)).encode(encoding))
+    def __call__(self, table, file=sys.stdout, encoding="utf-8", rows=None):
+        """
+        Write the table to the file-like object *file*. The rows are
+        formatted and written in blocks, see :class:`BlockWriter`.
+        *rows* may be a slice to write only a range of rows.
+        """
+        lines = self._output_lines(table, rows=rows)
+        with BlockWriter(file, encoding) as writer:
+            writer.write(next(lines))
+            for line in lines:
+                writer.write("\n")
+                writer.write(line)
 
+    def write_pages(self, table, path_pattern, rows_per_page, encoding="utf-8"):
+        """
+        Write the rows of *table* into several files with at most
+        *rows_per_page* rows each, every one a complete table including
+        the header. See :func:`write_pages` for *path_pattern* and the
+        return value.
+        """
+        return write_pages(
+            lambda file, rows: self(table, file=file, encoding=encoding, rows=rows),
+            min(map(len, self.columns(table))),
+            path_pattern,
+            rows_per_page)
@@ -0,0 +1,158 @@
+# encoding=utf-8
+"""
+Render many gnuplot plots in a single gnuplot process.
+
+A :class:`PlotBatch` collects :class:`Plot` objects, each made of
+series of table columns and their style. :meth:`PlotBatch.script`
+produces one gnuplot script which defines the data of all series as
+inline data blocks (`$name << EOD`) and draws all plots, so that
+:meth:`PlotBatch.render` only needs to start gnuplot once.
+"""
+from __future__ import unicode_literals, division, print_function
+from our_future import *
+
+import io
+from subprocess import Popen, PIPE, CalledProcessError
+
+from Document.GnuplotPrinter import GnuplotPrinter
+
+def quote(text):
+    """
+    Return *text* as a single-quoted gnuplot string.
+    """
+    return "'" + text.replace("'", "''") + "'"
+
+class Series(object):
+    """
+    One series of a plot: the columns *columnKeys* of *table*, printed
+    with a :class:`GnuplotPrinter` constructed with *printerOptions*
+    (e.g. *attachments* or *decimate*; binary output cannot be
+    inlined).
+
+    *using* is the gnuplot `using` specification; by default the values
+    of all columns are used in order, skipping their attachments. *style*
+    is put after `with` and *title* is the key entry, *None* for
+    `notitle`.
+    """
+
+    def __init__(self, table, columnKeys, style="points", title=None, using=None, **printerOptions):
+        self.table = table
+        self.printer = GnuplotPrinter(columnKeys, **printerOptions)
+        self.style = style
+        self.title = title
+        self._using = using
+
+    def columns(self):
+        """
+        Return the printed (possibly decimated) columns of the series,
+        to be passed to the other methods.
+        """
+        return self.printer.columns(self.table)
+
+    def data(self, columns):
+        """
+        Return the data lines of *columns* as unicode.
+        """
+        buf = io.StringIO()
+        self.printer.printColumns(columns, file=buf, encoding=None)
+        return buf.getvalue()
+
+    def using(self, columns):
+        """
+        Return the `using` specification of the series.
+        """
+        if self._using is not None:
+            return self._using
+        fields = self.printer.fields(columns)
+        return ":".join(
+            unicode(i) for i, (_, key) in enumerate(fields, 1) if key is None)
+
+    def plotSpec(self, block, columns):
+        """
+        Return the part of the `plot` command drawing *columns* from
+        the data block *block*.
+        """
+        title = "notitle" if self.title is None else "title " + quote(self.title)
+        return "{0} using {1} with {2} {3}".format(block, self.using(columns), self.style, title)
+
+
+class Plot(object):
+    """
+    One plot written to the file *output* with the gnuplot *terminal*.
+    *settings* is a list of gnuplot commands (e.g. `"set logscale y"`)
+    issued before plotting.
+    """
+
+    def __init__(self, output, terminal="pdfcairo", settings=[]):
+        self.output = output
+        self.terminal = terminal
+        self.settings = list(settings)
+        self.series = []
+
+    def add(self, table, columnKeys, **kwargs):
+        """
+        Add a :class:`Series` of the columns *columnKeys* of *table*,
+        see there for *kwargs*. Return the series.
+        """
+        series = Series(table, columnKeys, **kwargs)
+        self.series.append(series)
+        return series
+
+
+class PlotBatch(object):
+    """
+    Collect plots and render them in one run of the *gnuplot*
+    executable.
+    """
+
+    def __init__(self, gnuplot="gnuplot"):
+        self._gnuplot = gnuplot
+        self.plots = []
+
+    def plot(self, output, **kwargs):
+        """
+        Create a :class:`Plot` of *output* (see there for *kwargs*), add
+        it to the batch and return it.
+        """
+        plot = Plot(output, **kwargs)
+        self.plots.append(plot)
+        return plot
+
+    def script(self):
+        """
+        Return the gnuplot script rendering all plots of the batch as
+        unicode. The data of each series is inlined as a data block;
+        the settings are reset between the plots.
+        """
+        lines = []
+        blocks = []
+        for i, plot in enumerate(self.plots):
+            specs = []
+            for j, series in enumerate(plot.series):
+                name = "$data_{0}_{1}".format(i, j)
+                columns = series.columns()
+                lines.append(name + " << EOD")
+                lines.append(series.data(columns) + "EOD")
+                specs.append(series.plotSpec(name, columns))
+            blocks.append(specs)
+
+        for plot, specs in zip(self.plots, blocks):
+            lines.append("reset")
+            lines.append("set terminal " + plot.terminal)
+            lines.append("set output " + quote(plot.output))
+            lines.extend(plot.settings)
+            if specs:
+                lines.append("plot " + ", ".join(specs))
+            lines.append("unset output")
+        return "\n".join(lines) + "\n"
+
+    def render(self):
+        """
+        Run gnuplot once on :meth:`script`. Raise
+        :class:`subprocess.CalledProcessError` with the output of
+        gnuplot if it fails.
+        """
+        process = Popen([self._gnuplot], stdin=PIPE, stdout=PIPE, stderr=PIPE)
+        stdout, stderr = process.communicate(self.script().encode("utf-8"))
+        if process.returncode != 0:
+            raise CalledProcessError(process.returncode, self._gnuplot, output=stderr)
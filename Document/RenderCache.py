@@ -0,0 +1,172 @@
+# encoding=utf-8
+"""
+Skip re-rendering outputs whose content did not change.
+
+A :class:`RenderCache` remembers a content hash for each output file it
+wrote. The hash covers everything the output depends on, e.g. the data
+and attachments of the printed columns and the options of the printer.
+If the hash of a later render matches and the file was not touched in
+the meantime, formatting is skipped and the file is left alone, so its
+modification time does not change and LaTeX does not rebuild.
+
+Outputs and the index are written atomically (see
+:func:`utils.atomicWrite`) and the cache may be shared by several
+threads. It is not shared with the worker processes of a
+:class:`RenderJobs.RenderRunner`.
+"""
+from __future__ import unicode_literals, division, print_function
+from our_future import *
+
+import os
+import json
+import hashlib
+import threading
+
+import numpy as np
+import sympy as sp
+
+from utils import atomicWrite
+
+def fingerprint(hasher, obj):
+    """
+    Feed a canonical representation of *obj* into the :mod:`hashlib`
+    object *hasher*. Equal objects give equal input, independent of the
+    ordering of dicts and sets and of the memory addresses of objects.
+    """
+    if obj is None or isinstance(obj, (bool, int, long, float)):
+        hasher.update(repr(obj).encode("utf-8"))
+    elif isinstance(obj, (unicode, str)):
+        hasher.update(b"s")
+        hasher.update(obj.encode("utf-8") if isinstance(obj, unicode) else obj)
+    elif isinstance(obj, np.ndarray):
+        hasher.update(str(obj.dtype).encode("utf-8"))
+        hasher.update(repr(obj.shape).encode("utf-8"))
+        hasher.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, sp.Basic):
+        hasher.update(sp.srepr(obj).encode("utf-8"))
+    elif isinstance(obj, type):
+        hasher.update("{0}.{1}".format(obj.__module__, obj.__name__).encode("utf-8"))
+    elif isinstance(obj, dict):
+        fingerprint(hasher, sorted(
+            (digest(key), digest(value)) for key, value in obj.iteritems()))
+    elif isinstance(obj, (set, frozenset)):
+        fingerprint(hasher, sorted(map(digest, obj)))
+    elif isinstance(obj, (list, tuple)):
+        hasher.update("[{0}".format(len(obj)).encode("utf-8"))
+        for item in obj:
+            fingerprint(hasher, item)
+        hasher.update(b"]")
+    elif hasattr(obj, "__dict__"):
+        fingerprint(hasher, type(obj))
+        fingerprint(hasher, vars(obj))
+    else:
+        hasher.update(repr(obj).encode("utf-8"))
+
+def digest(*objs):
+    """
+    Return the hex digest of the canonical representation of *objs*,
+    see :func:`fingerprint`.
+    """
+    hasher = hashlib.sha1()
+    fingerprint(hasher, list(objs))
+    return hasher.hexdigest()
+
+def columnContent(column):
+    """
+    Return an object describing everything about *column* which can be
+    printed: symbol, unit, values and attachments. Numeric columns are
+    described by their float arrays; exact columns by their values.
+    """
+    keys = sorted(column.attachments, key=digest)
+    if column.numeric:
+        values = column.dataArray()
+        attachments = [column.attachmentArray(key) for key in keys]
+    else:
+        values = list(column.data)
+        attachments = [list(column.attachments[key].data) for key in keys]
+    return (column.symbol, column.unit, column.unitExpr, column.magnitude,
+            keys, values, attachments)
+
+
+class RenderCache(object):
+    """
+    Render cache backed by the JSON index file *indexPath*, which maps
+    the absolute path of each output file to the content hash it was
+    rendered from.
+    """
+
+    def __init__(self, indexPath=".render-cache.json"):
+        self._indexPath = indexPath
+        self._lock = threading.Lock()
+        try:
+            with open(indexPath, "rb") as file:
+                self._index = json.loads(file.read().decode("utf-8"))
+        except (IOError, ValueError):
+            self._index = {}
+
+    @staticmethod
+    def _stat(path):
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime]
+
+    def isCurrent(self, path, key):
+        """
+        Return whether the file at *path* exists, was last written by
+        the cache from content with the hash *key* and was not modified
+        since.
+        """
+        with self._lock:
+            entry = self._index.get(os.path.abspath(path))
+        if entry is None or entry["key"] != key:
+            return False
+        try:
+            return self._stat(path) == entry["stat"]
+        except OSError:
+            return False
+
+    def write(self, path, content, write):
+        """
+        Write the file *path* atomically by calling *write* with a file
+        opened in binary mode, unless it is current for the hash of
+        *content* (any object accepted by :func:`digest`).
+
+        Return *True* if the file was written and *False* if it was
+        skipped.
+        """
+        key = digest(content)
+        if self.isCurrent(path, key):
+            return False
+        atomicWrite(path, write)
+        with self._lock:
+            self._index[os.path.abspath(path)] = {
+                "key": key,
+                "stat": self._stat(path)
+            }
+            self._save()
+        return True
+
+    def render(self, printer, table, path, **kwargs):
+        """
+        Print *table* with *printer* into the file *path*, unless the
+        printed columns, their attachments, the printer options and the
+        `formatVersion` of the printer are unchanged since the file was
+        last rendered. *kwargs* are passed to the printer.
+
+        Return *True* if the file was written and *False* if it was
+        skipped.
+        """
+        columns = printer.columns(table)
+        content = (printer, getattr(printer, "formatVersion", None), kwargs,
+                   list(map(columnContent, columns)))
+        if hasattr(printer, "printColumns"):
+            # print the columns hashed above instead of looking them up
+            # (and possibly decimating them) again
+            write = lambda file: printer.printColumns(columns, file=file, **kwargs)
+        else:
+            write = lambda file: printer(table, file=file, **kwargs)
+        return self.write(path, content, write)
+
+    def _save(self):
+        # called with the lock held
+        data = json.dumps(self._index, sort_keys=True, indent=1)
+        atomicWrite(self._indexPath, lambda file: file.write(data.encode("utf-8")))
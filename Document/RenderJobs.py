@@ -0,0 +1,116 @@
+# encoding=utf-8
+"""
+Render many tables with many printers in parallel.
+
+A :class:`RenderRunner` collects jobs, each printing a table with a
+printer (e.g. :class:`LaTeXPrinter.siunitxPrinter`,
+:class:`TablePrinter.SimplePrinter` or
+:class:`GnuplotPrinter.GnuplotPrinter`) into an output file, and runs
+them on a pool of worker processes. Every output is written atomically (see
+:func:`utils.atomicWrite`), so a failing or interrupted job never leaves
+a truncated file behind, and the time taken by each job is reported.
+"""
+from __future__ import unicode_literals, division, print_function
+from our_future import *
+
+import time
+import pickle
+import traceback
+import collections
+import multiprocessing
+
+from utils import atomicWrite
+
+RenderJob = collections.namedtuple("RenderJob", ["table", "printer", "path", "kwargs"])
+"""A table printed by *printer* into the file *path*, passing *kwargs*."""
+
+JobResult = collections.namedtuple("JobResult", ["path", "seconds", "error", "traceback"])
+"""
+The outcome of a :class:`RenderJob`: the wall time taken and the
+exception raised by the job along with the formatted traceback from the
+worker process, both *None* if the job succeeded.
+"""
+
+class RenderError(Exception):
+    """
+    Raised by :meth:`RenderRunner.run` for a failed job. *result* is the
+    :class:`JobResult` of the job; the message includes the traceback
+    from the worker process.
+    """
+
+    def __init__(self, result):
+        super(RenderError, self).__init__(
+            "Rendering {0} failed:\n{1}".format(result.path, result.traceback))
+        self.result = result
+        self.error = result.error
+
+def _render(job):
+    start = time.time()
+    try:
+        atomicWrite(
+            job.path,
+            lambda file: job.printer(job.table, file=file, **job.kwargs))
+        error = formatted = None
+    except Exception as err:
+        error, formatted = err, traceback.format_exc()
+        try:
+            pickle.dumps(error, 2)
+        except Exception:
+            # the exception has to be sent back to the parent process
+            error = Exception(repr(err))
+    return JobResult(job.path, time.time() - start, error, formatted)
+
+class RenderRunner(object):
+    """
+    Collect render jobs and run them on a pool of *processes* worker
+    processes (by default, one per CPU). Tables and printers are
+    pickled to the workers, which format the tables and write the
+    outputs themselves.
+    """
+
+    def __init__(self, processes=None):
+        self._processes = processes
+        self.jobs = []
+
+    def add(self, table, printer, path, **kwargs):
+        """
+        Add a job printing *table* with *printer* into the file *path*.
+        *kwargs* are passed to the printer.
+        """
+        self.jobs.append(RenderJob(table, printer, path, kwargs))
+
+    def run(self, strict=True):
+        """
+        Run all jobs and return the list of their :class:`JobResult`
+        tuples, in the order the jobs were added.
+
+        All jobs are run even if some fail; if *strict* is true, a
+        :class:`RenderError` for the first failed job is raised
+        afterwards.
+        """
+        pool = multiprocessing.Pool(self._processes)
+        try:
+            results = pool.map(_render, self.jobs, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+        if strict:
+            for result in results:
+                if result.error is not None:
+                    raise RenderError(result)
+        return results
+
+def report(results):
+    """
+    Return a text report of the timing of the *results* of
+    :meth:`RenderRunner.run`, one line per job and the total.
+    """
+    lines = []
+    for result in results:
+        line = "{0:9.3f} s  {1}".format(result.seconds, result.path)
+        if result.error is not None:
+            line += "  FAILED: {0!r}".format(result.error)
+        lines.append(line)
+    lines.append("{0:9.3f} s  total ({1} jobs)".format(
+        sum(result.seconds for result in results), len(results)))
+    return "\n".join(lines)
@@ -4,15 +4,72 @@ from our_future import *
 
 import abc
 import sys
+import math
 import itertools
-import sympy as sp
+
+import numpy as np
 
 from Evaluation.ValueClasses import (
     StatisticalUncertainty, SystematicalUncertainty, Uncertainty)
 
+# number of rows which are formatted at once when printing
+BLOCK_ROWS = 4096
+
+class BlockWriter(object):
+    """
+    Collect text written to it and pass it on to the file-like object
+    *file* in blocks of at least *blockSize* characters, so that huge
+    tables can be written to pipes or compressed files with few write
+    calls and without holding the whole document in memory.
+
+    The text is encoded using *encoding* before it is written; if
+    *encoding* is *None*, the text is written as is (e.g. for text
+    streams of :mod:`io`).
+
+    Use the writer as context manager or call :meth:`flush` when done.
+    """
+
+    def __init__(self, file, encoding="utf-8", blockSize=2**16):
+        self._file = file
+        self._encoding = encoding
+        self._blockSize = blockSize
+        self._parts = []
+        self._size = 0
+
+    def write(self, text):
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self._blockSize:
+            self.flush()
+
+    def flush(self):
+        """
+        Write all collected text to the file.
+        """
+        if not self._parts:
+            return
+        text = "".join(self._parts)
+        self._parts = []
+        self._size = 0
+        if self._encoding is not None:
+            text = text.encode(self._encoding)
+        self._file.write(text)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if excType is None:
+            self.flush()
+        return False
+
 class TablePrinter(object):
     defaultAttachments = [StatisticalUncertainty, SystematicalUncertainty]
 
+    # increase when the output for the same input changes, to invalidate
+    # outputs cached by a :class:`RenderCache.RenderCache`
+    formatVersion = 1
+
     def __init__(self, columnKeys, attachments=defaultAttachments, merge=False,
             error_joiner="±",
             symbol_map={},
@@ -64,24 +121,86 @@ class TablePrinter(object):
         main = self._format.format(self.toFloat(field[0]))
         mid = (errorJoiner if len(values) > 0 else "")
         if self._merge:
-            attachments = sp.sqrt(sum(map(self.sqr, map(self.toFloat, values))))
-            attachments = self._secondaryFormat.format(float(attachments))
+            attachments = math.sqrt(sum(map(self.sqr, map(self.toFloat, values))))
+            attachments = self._secondaryFormat.format(attachments)
         else:
             attachments = (errorJoiner.join(map(self._secondaryFormat.format, map(self.toFloat, values))))
         return main+mid+attachments
 
+    def columnArrays(self, column):
+        """
+        Return the tuple `(values, errors)` of the float arrays printed
+        for *column*, where *errors* holds one array for each of the
+        printed attachments.
+        """
+        errors = [column.attachmentArray(key) if key in column.attachments
+                  else np.zeros(len(column))
+                  for key in self.attachments]
+        return column.dataArray(), errors
+
+    def formatArrays(self, values, errors):
+        """
+        Format the cells given by the arrays *values* and *errors* (see
+        :meth:`columnArrays`) like :meth:`formatField` does, but working
+        on whole arrays. Return the list of strings.
+        """
+        length = len(values)
+        main = list(map(self._format.format, values.tolist()))
+        if not errors and not self._merge:
+            return main
+        mid = (self._error_joiner if len(errors) > 0 else "")
+        secondary = self._secondaryFormat.format
+        if self._merge:
+            merged = np.zeros(length)
+            for error in errors:
+                merged += error**2
+            attachments = list(map(secondary, np.sqrt(merged).tolist()))
+        else:
+            attachments = list(map(self._error_joiner.join, zip(*[
+                list(map(secondary, error.tolist())) for error in errors])))
+        return [value + mid + attachment for value, attachment in zip(main, attachments)]
+
+    def formatColumn(self, column):
+        """
+        Format all cells of *column*, see :meth:`formatArrays`.
+        """
+        return self.formatArrays(*self.columnArrays(column))
+
+    def iterRows(self, columns, blockRows=BLOCK_ROWS, rows=None):
+        """
+        Yield the rows of *columns* as tuples of formatted cells. The
+        columns are formatted in blocks of *blockRows* rows, so only one
+        block of formatted cells is held in memory at a time.
+
+        *rows* may be a slice to restrict the output to a range of rows.
+        """
+        arrays = [self.columnArrays(column) for column in columns]
+        length = min(len(values) for values, _ in arrays) if arrays else 0
+        start, stop, _ = (rows or slice(None)).indices(length)
+        for start in range(start, stop, blockRows):
+            block = slice(start, min(start + blockRows, stop))
+            cells = [self.formatArrays(values[block], [error[block] for error in errors])
+                     for values, errors in arrays]
+            for row in zip(*cells):
+                yield row
+
+    def columns(self, table):
+        """
+        Return the list of the columns of *table* which are printed.
+        """
+        return list(map(table.__getitem__, self._columnKeys))
+
     def __call__(self, table, file=sys.stdout):
-        columns = list(map(table.__getitem__, self._columnKeys))
-        self.printColumns(columns, file=file)
+        self.printColumns(self.columns(table), file=file)
 
 
 class SimplePrinter(TablePrinter):
     def __init__(self, columnKeys, width=12, **kwargs):
         super(SimplePrinter, self).__init__(columnKeys, **kwargs)
-        self._format = "{{0:{0}.{1}f}}".format(width, precision)
-        self._secondaryFormat = "{{0:.{0}f}}".format(precision)
+        self._format = "{{0:{0}.{1}f}}".format(width, self._precision)
+        self._secondaryFormat = "{{0:.{0}f}}".format(self._precision)
 
     def printColumns(self, columns, file=sys.stdout, encoding="utf-8"):
-        tableData = itertools.izip(*columns)
-        for row in tableData:
-            print(' '.join(map(self.formatField, row)).encode(encoding), file=file)
+        with BlockWriter(file, encoding) as writer:
+            for row in self.iterRows(columns):
+                writer.write(' '.join(row) + '\n')
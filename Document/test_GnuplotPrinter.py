@@ -0,0 +1,44 @@
+# encoding=utf-8
+from __future__ import division, print_function, unicode_literals
+from our_future import *
+
+import unittest
+import io
+
+import numpy
+import sympy
+
+from GnuplotPrinter import GnuplotPrinter
+from Evaluation import Column, Table
+from Evaluation.ValueClasses import StatisticalUncertainty
+
+class GnuplotPrinterTest(unittest.TestCase):
+    def setUp(self):
+        x = Column.MeasurementColumn(sympy.Symbol(b"x"), "s", numeric=True)
+        x.rawExtend([0., 1., 2.])
+        y = Column.MeasurementColumn(sympy.Symbol(b"y"), "m", numeric=True)
+        y.attach(StatisticalUncertainty, default=0)
+        y.rawExtend([0., 1., 4.], {StatisticalUncertainty: [0.1, 0.2, 0.3]})
+        self.table = Table.Table([x, y])
+
+    def test_text(self):
+        file = io.BytesIO()
+        GnuplotPrinter(["x", "y"], attachments=[StatisticalUncertainty], precision=1)(self.table, file=file)
+        self.assertEqual(file.getvalue(), b"0.0 0.0 0.0 0.1\n1.0 0.0 1.0 0.2\n2.0 0.0 4.0 0.3\n")
+
+    def test_binary(self):
+        printer = GnuplotPrinter(["x", "y"], attachments=[StatisticalUncertainty], binary=True)
+        file = io.BytesIO()
+        columns = printer(self.table, file=file)
+        records = numpy.frombuffer(file.getvalue(), dtype="<f8").reshape(3, 4)
+        self.assertEqual(records[:, 2].tolist(), [0., 1., 4.])
+        self.assertEqual(records[:, 3].tolist(), [0.1, 0.2, 0.3])
+        self.assertEqual(
+            printer.binarySpec(columns, using=[1, 3, 4]),
+            'binary format="%4float64" endian=little using 1:3:4')
+
+    def test_decimate(self):
+        file = io.BytesIO()
+        GnuplotPrinter(["x", "y"], attachments=[StatisticalUncertainty], precision=1,
+            decimate=2, decimation="minmax")(self.table, file=file)
+        self.assertEqual(file.getvalue(), b"0.0 0.0 0.0 0.1\n2.0 0.0 4.0 0.3\n")
@@ -0,0 +1,125 @@
+# encoding=utf-8
+from __future__ import division, print_function, unicode_literals
+from our_future import *
+
+import unittest
+import io
+import math
+
+import sympy
+
+import LaTeXPrinter
+from Evaluation import Column, Table
+from Evaluation.ValueClasses import StatisticalUncertainty, SystematicalUncertainty
+
+class TableLines(unittest.TestCase):
+    def test_tabular(self):
+        self.assertEqual(
+            list(LaTeXPrinter.table_lines("rr", r"a & b \\", [r"1 & 2 \\"], booktabs=False)),
+            [r"\begin{tabular}{rr}", r"a & b \\", r"1 & 2 \\", r"\end{tabular}"])
+
+    def test_longtable(self):
+        lines = list(LaTeXPrinter.table_lines("r", r"a \\", [r"1 \\", r"2 \\"], longtable=True))
+        self.assertEqual(lines[0], r"\begin{longtable}{r}")
+        self.assertEqual(lines.count(r"a \\"), 2)
+        self.assertEqual(lines.count(r"\bottomrule"), 1)
+        self.assertLess(lines.index(r"\endlastfoot"), lines.index(r"1 \\"))
+        self.assertEqual(lines[-1], r"\end{longtable}")
+
+class Summarize(unittest.TestCase):
+    def test_summarize(self):
+        summary = dict((label, (value, error))
+                       for label, value, error in LaTeXPrinter.summarize([1., 2., 3.]))
+        self.assertEqual(summary["N"], (3, None))
+        self.assertAlmostEqual(summary["mean"][0], 2.)
+        self.assertAlmostEqual(summary["mean"][1], 1 / 3**0.5)
+        self.assertEqual((summary["min"][0], summary["max"][0]), (1., 3.))
+
+    def test_empty(self):
+        summary = dict((label, (value, error))
+                       for label, value, error in LaTeXPrinter.summarize([]))
+        self.assertEqual(summary["N"], (0, None))
+        for label in ("mean", "std", "min", "max"):
+            self.assertTrue(math.isnan(summary[label][0]))
+        self.assertTrue(math.isnan(summary["mean"][1]))
+
+class TableFormat(unittest.TestCase):
+    def test_update(self):
+        table_format = LaTeXPrinter.TableFormat(2)
+        table_format.update(["1.235", "-20.5"], [["0.012", "0.5"], ["0.300", "0.0"]])
+        table_format.update(["100"], [["3"], ["12"]])
+        self.assertEqual(table_format.option(), "table-format=-3.3(2)(3)")
+
+class siunitxPrinter(unittest.TestCase):
+    def test_attachments(self):
+        column = Column.MeasurementColumn(sympy.Symbol(b"x"), "m", numeric=True)
+        column.attach(StatisticalUncertainty, default=0)
+        column.attach(SystematicalUncertainty, default=0)
+        column.rawExtend([1.23456, -20.5], {
+            StatisticalUncertainty: [0.012, 0.5],
+            SystematicalUncertainty: [0.3, 0.],
+        })
+        printer = LaTeXPrinter.siunitxPrinter(["x"],
+            attachments=[StatisticalUncertainty, SystematicalUncertainty],
+            booktabs=False, table_format=True)
+        file = io.BytesIO()
+        printer(Table.Table([column]), file=file)
+        self.assertEqual(file.getvalue().decode("utf-8").split("\n"), [
+            r"\begin{tabular}{S[table-format=-2.3(2)(3)]}",
+            r"{$x\,\,[\si{\m}]$} \\",
+            r"1.235 +- 0.012 +- 0.300 \\",
+            r"-20.5 +- 0.5 +- 0.0 \\",
+            r"\end{tabular}"])
+
+class GoldenOutput(unittest.TestCase):
+    """
+    Compare the output of the vectorized printers byte for byte with the
+    output of the former per-cell implementation.
+    """
+
+    def setUp(self):
+        nan = float("nan")
+        x = Column.MeasurementColumn(sympy.Symbol(b"x"), "m", numeric=True)
+        x.attach(StatisticalUncertainty, default=0)
+        x.rawExtend([1.23456, -20.5, 0.0, 999.95, nan],
+            {StatisticalUncertainty: [0.012, 0.5, 0.25, 0.05, 0.1]})
+        y = Column.MeasurementColumn(sympy.Symbol(b"y"), "s", numeric=True)
+        y.attach(StatisticalUncertainty, default=0)
+        y.rawExtend([-0.000123, 4.5e6, -3.25, 12.0, 7.0],
+            {StatisticalUncertainty: [0.0000045, 1.2e4, nan, 0.0, 0.35]})
+        t = Column.MeasurementColumn(sympy.Symbol(b"t"), "K", numeric=True)
+        t.rawExtend([-1.5, 2.25, nan, 1e-7, -123456.789])
+        self.table = Table.Table([x, y, t])
+
+    def render(self, printer):
+        file = io.BytesIO()
+        printer(self.table, file=file)
+        return file.getvalue()
+
+    def test_LaTeXPrinter(self):
+        printer = LaTeXPrinter.LaTeXPrinter(["x", "y", "t"],
+            attachments=[StatisticalUncertainty], precision=3)
+        self.assertEqual(self.render(printer), b"".join([
+            b"\\begin{tabular}{rrr}\n\\toprule\n",
+            b"$x\\,\\,[\\si{\\m}]$ & $y\\,\\,[\\si{\\s}]$ & $t\\,\\,[\\si{\\K}]$\\\\\n\\midrule\n",
+            b"1.235\xc2\xb10.012 & -0.000\xc2\xb10.000 & -1.500\xc2\xb10.000\\\\\n",
+            b"-20.500\xc2\xb10.500 & 4500000.000\xc2\xb112000.000 & 2.250\xc2\xb10.000\\\\\n",
+            b"0.000\xc2\xb10.250 & -3.250\xc2\xb1nan & nan\xc2\xb10.000\\\\\n",
+            b"999.950\xc2\xb10.050 & 12.000\xc2\xb10.000 & 0.000\xc2\xb10.000\\\\\n",
+            b"nan\xc2\xb10.100 & 7.000\xc2\xb10.350 & -123456.789\xc2\xb10.000\\\\\n",
+            b"\\bottomrule\n\\end{tabular}\n"]))
+
+    def test_siunitxPrinter(self):
+        printer = LaTeXPrinter.siunitxPrinter(["x", "y", "t"],
+            attachments=[StatisticalUncertainty],
+            column_precision={sympy.Symbol(b"t"): 3})
+        self.assertEqual(self.render(printer), b"".join([
+            b"\\begin{tabular}{SSS}\n\\toprule\n",
+            b"{$x\\,\\,[\\si{\\m}]$} & {$y\\,\\,[\\si{\\s}]$} & {$t\\,\\,[\\si{\\K}]$} \\\\\n\\midrule\n",
+            b"1.235 +- 0.012 & -0.000123 +- 0.000005 & -1.500 \\\\\n",
+            b"-20.5 +- 0.5 & 4500000 +- 12000 & 2.250 \\\\\n",
+            b"0.00 +- 0.25 & -0 +- nan & nan \\\\\n",
+            b"999.95 +- 0.05 & 10 +- 0 & 0.0000001000 \\\\\n",
+            b"nan +- 0.10 & 7.00 +- 0.35 & -123500 \\\\\n",
+            b"\\bottomrule\n\\end{tabular}"]))
+
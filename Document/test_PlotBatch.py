@@ -0,0 +1,51 @@
+# encoding=utf-8
+from __future__ import division, print_function, unicode_literals
+from our_future import *
+
+import unittest
+import subprocess
+
+import sympy
+
+import PlotBatch
+from Evaluation import Column, Table
+from Evaluation.ValueClasses import StatisticalUncertainty
+
+class PlotBatchTest(unittest.TestCase):
+    def setUp(self):
+        x = Column.MeasurementColumn(sympy.Symbol(b"x"), "s", numeric=True)
+        x.rawExtend([0., 1.])
+        y = Column.MeasurementColumn(sympy.Symbol(b"y"), "m", numeric=True)
+        y.attach(StatisticalUncertainty, default=0)
+        y.rawExtend([0., 1.], {StatisticalUncertainty: [0.1, 0.2]})
+        self.table = Table.Table([x, y])
+        self.batch = PlotBatch.PlotBatch()
+        plot = self.batch.plot("y.pdf", settings=["set xlabel 'x'"])
+        plot.add(self.table, ["x", "y"], attachments=[StatisticalUncertainty],
+            precision=1, style="points", title="y's")
+        plot.add(self.table, ["x", "y"], attachments=[StatisticalUncertainty],
+            precision=1, style="yerrorbars", using="1:3:4")
+        self.batch.plot("empty.pdf")
+
+    def test_script(self):
+        self.assertEqual(self.batch.script(), "\n".join([
+            "$data_0_0 << EOD",
+            "0.0 0.0 0.0 0.1\n1.0 0.0 1.0 0.2\nEOD",
+            "$data_0_1 << EOD",
+            "0.0 0.0 0.0 0.1\n1.0 0.0 1.0 0.2\nEOD",
+            "reset",
+            "set terminal pdfcairo",
+            "set output 'y.pdf'",
+            "set xlabel 'x'",
+            "plot $data_0_0 using 1:3 with points title 'y''s', "
+                "$data_0_1 using 1:3:4 with yerrorbars notitle",
+            "unset output",
+            "reset",
+            "set terminal pdfcairo",
+            "set output 'empty.pdf'",
+            "unset output",
+        ]) + "\n")
+
+    def test_render(self):
+        PlotBatch.PlotBatch(gnuplot="cat").render()
+        self.assertRaises(subprocess.CalledProcessError, PlotBatch.PlotBatch(gnuplot="false").render)
@@ -0,0 +1,74 @@
+# encoding=utf-8
+from __future__ import division, print_function, unicode_literals
+from our_future import *
+
+import unittest
+import os
+import shutil
+import tempfile
+
+import sympy
+
+import RenderCache
+from LaTeXPrinter import siunitxPrinter
+from Evaluation import Column, Table
+from Evaluation.ValueClasses import StatisticalUncertainty
+
+class RenderCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.column = Column.MeasurementColumn(sympy.Symbol(b"x"), "m", numeric=True)
+        self.column.attach(StatisticalUncertainty, default=0.1)
+        self.column.rawExtend([1., 2., 3.])
+        self.table = Table.Table([self.column])
+        self.path = os.path.join(self.directory, "table.tex")
+        self.indexPath = os.path.join(self.directory, "index.json")
+
+    def render(self, **kwargs):
+        cache = RenderCache.RenderCache(self.indexPath)
+        printer = siunitxPrinter(["x"], attachments=[StatisticalUncertainty], **kwargs)
+        return cache.render(printer, self.table, self.path)
+
+    def test_skip(self):
+        self.assertTrue(self.render())
+        stat = os.stat(self.path)
+        self.assertFalse(self.render())
+        self.assertEqual(os.stat(self.path).st_mtime, stat.st_mtime)
+
+    def test_changes(self):
+        self.assertTrue(self.render())
+        self.assertTrue(self.render(precision=2))
+        self.column.data[0] = 4.
+        self.assertTrue(self.render(precision=2))
+        self.assertFalse(self.render(precision=2))
+        os.remove(self.path)
+        self.assertTrue(self.render(precision=2))
+
+    def test_formatVersion(self):
+        self.assertTrue(self.render())
+        self.assertFalse(self.render())
+        siunitxPrinter.formatVersion += 1
+        try:
+            self.assertTrue(self.render())
+        finally:
+            siunitxPrinter.formatVersion -= 1
+
+    def test_failure(self):
+        self.assertTrue(self.render())
+        with open(self.path, "rb") as file:
+            content = file.read()
+        cache = RenderCache.RenderCache(self.indexPath)
+        self.assertRaises(ZeroDivisionError, cache.write, self.path, "other",
+            lambda file: (file.write(b"partial"), 1 / 0))
+        with open(self.path, "rb") as file:
+            self.assertEqual(file.read(), content)
+        self.assertEqual(sorted(os.listdir(self.directory)), ["index.json", "table.tex"])
+
+    def test_digest(self):
+        self.assertEqual(
+            RenderCache.digest({"a": 1, "b": [1., sympy.Symbol(b"x")]}),
+            RenderCache.digest({"b": [1., sympy.Symbol(b"x")], "a": 1}))
+        self.assertNotEqual(RenderCache.digest([1, 2]), RenderCache.digest([2, 1]))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
@@ -0,0 +1,85 @@
+# encoding=utf-8
+from __future__ import division, print_function, unicode_literals
+from our_future import *
+
+import unittest
+import os
+import stat
+import shutil
+import tempfile
+
+import sympy
+
+import RenderJobs
+from TablePrinter import SimplePrinter
+from GnuplotPrinter import GnuplotPrinter
+from LaTeXPrinter import siunitxPrinter
+from Evaluation import Column, Table
+from Evaluation.ValueClasses import StatisticalUncertainty
+
+class RenderRunnerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        column = Column.MeasurementColumn(sympy.Symbol(b"x"), "m", numeric=True)
+        column.attach(StatisticalUncertainty, default=0.1)
+        column.rawExtend([1., 2., 3.])
+        self.table = Table.Table([column])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_run(self):
+        runner = RenderJobs.RenderRunner(processes=2)
+        printers = [
+            ("table.tex", siunitxPrinter(["x"], attachments=[StatisticalUncertainty])),
+            ("table.txt", SimplePrinter(["x"], attachments=[StatisticalUncertainty])),
+            ("table.dat", GnuplotPrinter(["x"], attachments=[StatisticalUncertainty], precision=1)),
+        ]
+        for name, printer in printers:
+            runner.add(self.table, printer, self.path(name))
+        results = runner.run()
+        self.assertEqual([result.path for result in results], [self.path(name) for name, _ in printers])
+        self.assertTrue(all(result.error is None for result in results))
+        with open(self.path("table.dat"), "rb") as file:
+            self.assertEqual(file.read(), b"1.0 0.1\n2.0 0.1\n3.0 0.1\n")
+        self.assertIn("total (3 jobs)", RenderJobs.report(results))
+
+    def test_atomic(self):
+        path = self.path("table.dat")
+        with open(path, "wb") as file:
+            file.write(b"old")
+        runner = RenderJobs.RenderRunner()
+        runner.add(self.table, GnuplotPrinter(["y"]), path)
+        with self.assertRaises(RenderJobs.RenderError) as context:
+            runner.run()
+        self.assertIsInstance(context.exception.error, KeyError)
+        results = runner.run(strict=False)
+        self.assertIsInstance(results[0].error, KeyError)
+        self.assertIn("FAILED", RenderJobs.report(results))
+        with open(path, "rb") as file:
+            self.assertEqual(file.read(), b"old")
+        self.assertEqual(os.listdir(self.directory), ["table.dat"])
+
+    def test_traceback(self):
+        runner = RenderJobs.RenderRunner()
+        runner.add(self.table, GnuplotPrinter(["y"]), self.path("table.dat"))
+        results = runner.run(strict=False)
+        self.assertIn("in __getitem__", results[0].traceback)
+        with self.assertRaises(RenderJobs.RenderError) as context:
+            runner.run()
+        self.assertIn("in __getitem__", unicode(context.exception))
+
+    def test_mode(self):
+        umask = os.umask(0)
+        os.umask(umask)
+        path = self.path("table.dat")
+        runner = RenderJobs.RenderRunner()
+        runner.add(self.table, GnuplotPrinter(["x"]), path)
+        runner.run()
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o666 & ~umask)
+        os.chmod(path, 0o640)
+        runner.run()
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o640)
@@ -0,0 +1,34 @@
+# encoding=utf-8
+from __future__ import division, print_function, unicode_literals
+from our_future import *
+
+import unittest
+import io
+
+import TablePrinter
+
+class CountingFile(io.BytesIO):
+    def __init__(self):
+        super(CountingFile, self).__init__()
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        return super(CountingFile, self).write(data)
+
+class BlockWriterTest(unittest.TestCase):
+    def test_blocks(self):
+        file = CountingFile()
+        with TablePrinter.BlockWriter(file, blockSize=100) as writer:
+            for i in range(100):
+                writer.write("±{0:9d}\n".format(i))
+        self.assertEqual(file.writes, 10)
+        self.assertEqual(
+            file.getvalue().decode("utf-8"),
+            "".join("±{0:9d}\n".format(i) for i in range(100)))
+
+    def test_unencoded(self):
+        file = io.StringIO()
+        with TablePrinter.BlockWriter(file, encoding=None) as writer:
+            writer.write("±")
+        self.assertEqual(file.getvalue(), "±")
@@ -0,0 +1,183 @@
+# encoding=utf-8
+"""
+Bootstrap estimates for the uncertainty of derived quantities for which
+gaussian error propagation is not good enough.
+
+The rows of the source columns are resampled with replacement, the
+derived quantity is re-evaluated for each resample and the spread of the
+results is taken as uncertainty. Resamples are evaluated in vectorized
+blocks and can be spread across a process pool; the results only depend
+on the *seed*, not on the number of processes.
+"""
+from __future__ import unicode_literals, division, print_function
+from our_future import *
+
+import abc
+import collections
+import multiprocessing
+
+import numpy as np
+
+import sympyUtils
+
+# upper bound for the number of resampled cells held in memory at once
+# per worker
+BLOCK_CELLS = 2**22
+
+BootstrapResult = collections.namedtuple(
+    "BootstrapResult",
+    ["value", "error", "interval", "samples"])
+
+
+class Statistic(object):
+    """
+    Base class for quantities which can be bootstrapped. Statistics
+    must be picklable to be evaluated in a process pool.
+    """
+
+    __metaclass__ = abc.ABCMeta
+
+    @abc.abstractmethod
+    def __call__(self, samples):
+        """
+        Evaluate the statistic for a block of resamples. *samples* is a
+        list with one array per source column, each of the shape
+        `(resamples, rows)`. Must return an array with the first
+        dimension of length `resamples`.
+        """
+
+
+class ExpressionStatistic(Statistic):
+    """
+    Evaluate the sympy *expression* on the means of the source columns,
+    which are referenced in the expression by *symbols* (in the order of
+    the source columns).
+    """
+
+    def __init__(self, expression, symbols):
+        self.expression = expression
+        self.symbols = list(symbols)
+        self._func = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_func"] = None
+        return state
+
+    def __call__(self, samples):
+        if self._func is None:
+            self._func = sympyUtils.compileExpression(self.expression, self.symbols)
+        return self._func(*[sample.mean(axis=-1) for sample in samples])
+
+
+class LinearFitStatistic(Statistic):
+    """
+    Least-squares fit of a straight line through the points of two
+    source columns, `(x, y)`. Returns the slope and the intercept of
+    each resample.
+    """
+
+    def __call__(self, samples):
+        x, y = samples
+        dx = x - x.mean(axis=-1)[..., np.newaxis]
+        dy = y - y.mean(axis=-1)[..., np.newaxis]
+        slope = (dx * dy).sum(axis=-1) / (dx**2).sum(axis=-1)
+        intercept = y.mean(axis=-1) - slope * x.mean(axis=-1)
+        return np.column_stack((slope, intercept))
+
+
+# state of the worker processes, set by _initWorker
+_workerState = None
+
+
+def _initWorker(statistic, data):
+    global _workerState
+    _workerState = statistic, data
+
+
+def _evaluate(statistic, data, count, seed):
+    rows = data.shape[1]
+    indices = np.random.RandomState(seed).randint(0, rows, size=(count, rows))
+    return np.asarray(statistic([column[indices] for column in data]))
+
+
+def _evaluateBlock(task):
+    return _evaluate(*(_workerState + task))
+
+
+def _evaluateTask(task):
+    return _evaluate(*task)
+
+
+def resample(statistic, data, resamples=1000, seed=None, processes=1, pool=None):
+    """
+    Evaluate *statistic* on *resamples* resamples of the rows of *data*
+    and return the array of results (one entry per resample).
+
+    *data* must be a sequence of one-dimensional arrays of equal length,
+    one per source column.
+
+    *seed* seeds the random number generator; equal seeds give equal
+    results. By default, everything is evaluated in the current
+    process, which is fastest for small tables. *processes* is the
+    number of worker processes to start for this call (*None* uses all
+    CPUs); alternatively, an existing :class:`multiprocessing.Pool` can
+    be passed as *pool* to reuse it over many calls.
+    """
+    data = np.vstack([np.asarray(column, dtype=np.float64) for column in data])
+    blockSize = max(1, min(resamples, BLOCK_CELLS // (data.shape[0] * data.shape[1])))
+    counts = [blockSize] * (resamples // blockSize)
+    if resamples % blockSize:
+        counts.append(resamples % blockSize)
+    seeds = np.random.RandomState(seed).randint(0, 2**31 - 1, size=len(counts))
+    tasks = list(zip(counts, seeds.tolist()))
+
+    if pool is not None:
+        results = pool.map(_evaluateTask, [
+            (statistic, data, count, seed) for count, seed in tasks])
+    elif processes == 1:
+        global _workerState
+        oldState = _workerState
+        _initWorker(statistic, data)
+        try:
+            results = list(map(_evaluateBlock, tasks))
+        finally:
+            _workerState = oldState
+    else:
+        pool = multiprocessing.Pool(
+            processes,
+            initializer=_initWorker,
+            initargs=(statistic, data))
+        try:
+            results = pool.map(_evaluateBlock, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    return np.concatenate(results)
+
+
+def bootstrap(statistic, data, resamples=1000, seed=None, processes=1,
+        pool=None, confidence=0.6827):
+    """
+    Bootstrap the uncertainty of *statistic* on *data*, see
+    :func:`resample` for the arguments.
+
+    Return a :class:`BootstrapResult` tuple `(value, error, interval,
+    samples)`. *value* is the statistic evaluated on the original data,
+    *error* the standard deviation of the resampled results and
+    *interval* the tuple of the lower and upper bound of the central
+    *confidence* interval of the resampled results. *samples* holds all
+    resampled results.
+    """
+    data = [np.asarray(column, dtype=np.float64) for column in data]
+    value = np.asarray(statistic([column[np.newaxis, :] for column in data]))[0]
+    samples = resample(statistic, data,
+        resamples=resamples,
+        seed=seed,
+        processes=processes,
+        pool=pool)
+    error = samples.std(axis=0, ddof=1)
+    tail = (1 - confidence) / 2 * 100
+    interval = (np.percentile(samples, tail, axis=0),
+                np.percentile(samples, 100 - tail, axis=0))
+    return BootstrapResult(value, error, interval, samples)
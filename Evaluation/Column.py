@@ -17,6 +17,8 @@ import sympyUtils
 
 import StatUtils
 import ValueClasses
+import Units
+import ErrorPropagation
 
 class Identity(object):
     """
@@ -88,13 +90,88 @@ class QuantityIterator(object):
         return self
 
 
+class FloatBuffer(object):
+    """
+    Growable one-dimensional float64 storage used for the data of
+    numeric columns. It supports the list operations used on column
+    data, with amortized constant time appends, and exposes its contents
+    as numpy array without copying (see :meth:`view`).
+    """
+    __slots__ = ("_array", "_length")
+
+    def __init__(self, values=(), capacity=16):
+        self._array = np.empty(capacity, dtype=np.float64)
+        self._length = 0
+        self.extend(values)
+
+    def _reserve(self, length):
+        if length > len(self._array):
+            array = np.empty(max(length, 2 * len(self._array)), dtype=np.float64)
+            array[:self._length] = self.view()
+            self._array = array
+
+    def append(self, value):
+        self._reserve(self._length + 1)
+        self._array[self._length] = float(value)
+        self._length += 1
+
+    def extend(self, values):
+        values = np.asarray(
+            values if isinstance(values, (np.ndarray, FloatBuffer)) else utils.toList(values),
+            dtype=np.float64).ravel()
+        length = self._length + len(values)
+        self._reserve(length)
+        self._array[self._length:length] = values
+        self._length = length
+
+    def view(self):
+        """
+        Return the contents as array sharing the memory of the buffer.
+        The view is invalidated by growing the buffer.
+        """
+        return self._array[:self._length]
+
+    def __array__(self, dtype=None):
+        if dtype is None:
+            return self.view()
+        return self.view().astype(dtype, copy=False)
+
+    def __getitem__(self, index):
+        return self.view()[index].tolist()
+
+    def __setitem__(self, index, value):
+        self.view()[index] = value
+
+    def __iter__(self):
+        return iter(self.view().tolist())
+
+    def __len__(self):
+        return self._length
+
+    def __eq__(self, other):
+        if not hasattr(other, "__len__"):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return str("FloatBuffer({0!r})").format(list(self))
+
+
 class ColumnAttachment(object):
-    def __init__(self, key, default=None, initialLength=0):
+    def __init__(self, key, default=None, initialLength=0, numeric=False):
         self.key = key
         self.default = default or key.getDefault()
         if initialLength > 0 and default is None:
             raise ValueError("Cannot create attachment without default value and with initial length")
         self.data = [default] * initialLength
+        if numeric:
+            self.data = FloatBuffer(self.data)
 
     def append(self, value):
         self.data.append(value)
@@ -138,24 +215,20 @@ class Column(object):
 
     *magnitude* can be a factor which is applied when printing the
     column, but this is mostly obsolete by now.
+
+    If *numeric* is *True*, the values and attachments of the column
+    are stored as plain float64 numbers in :cls:`FloatBuffer` objects
+    instead of lists of (possibly sympy) numbers. Numeric columns are
+    much faster to fill, calculate with and print, but lose the
+    exactness of sympy.
     """
     
-    def __init__(self, symbol, unit, magnitude=1, **kwargs):
+    def __init__(self, symbol, unit, magnitude=1, numeric=False, **kwargs):
         super(Column, self).__init__(**kwargs)
         self.attachments = dict()
         self.symbol = symbol
-        try:
-            if isinstance(unit, (unicode, str)):
-                raise TypeError()  # ugly, but avoids code duplication
-            if isinstance(unit, sp.Expr):
-                raise ValueError()
-            self.unit, self.unitExpr = unit
-        except ValueError:
-            self.unitExpr = unit
-            self.unit = str(unit)
-        except TypeError:
-            self.unit = unit
-            self.unitExpr = eval(unicode(unit), units.__dict__)
+        self.numeric = numeric
+        self.unit, self.unitExpr = parseUnit(unit)
         if magnitude is None:
             raise NotImplementedError("Cannot scale automagically yet")
         self.magnitude = magnitude
@@ -182,7 +255,10 @@ class Column(object):
         """
         if key in self.attachments:
             raise KeyError("Attachment {0} already defined".format(key))
-        self.attachments[key] = ColumnAttachment(key, default=default, initialLength=len(self))
+        self.attachments[key] = ColumnAttachment(key,
+            default=default,
+            initialLength=len(self),
+            numeric=self.numeric)
 
     newAttachment = attach
 
@@ -206,7 +282,18 @@ class Column(object):
         Delete all data from the column.
         """
         self.attachments = {}
-        self.data = []
+        self.data = FloatBuffer() if self.numeric else []
+
+    def _sequence(self, values):
+        """
+        Convert *values* into a sequence suitable for extending the data
+        or attachments of the column.
+        """
+        if self.numeric:
+            return np.asarray(
+                values if isinstance(values, np.ndarray) else utils.toList(values),
+                dtype=np.float64)
+        return utils.toList(values)
 
     def rawAppend(self, value, attachments=None):
         """
@@ -238,6 +325,75 @@ class Column(object):
 
     _append = rawAppend
 
+    def rawExtend(self, values, attachments=None):
+        """
+        Append a whole sequence of *values* at once, like repeated calls
+        to :meth:`rawAppend` would do.
+
+        *attachments* may be a `dict` mapping attachment keys to
+        sequences of the same length as *values*, or *None*. Attachments
+        declared in the object but missing in *attachments* are filled
+        with their default value.
+        """
+        values = self._sequence(values)
+        attachments = attachments or {}
+        for key, attachment in self.attachments.iteritems():
+            attachmentValues = attachments.get(key, None)
+            if attachmentValues is None:
+                if attachment.default is None:
+                    raise ValueError("Must have a value for attachment {0} (no default given)".format(key))
+                attachment.data.extend([attachment.default] * len(values))
+            else:
+                attachmentValues = self._sequence(attachmentValues)
+                if len(attachmentValues) != len(values):
+                    raise ValueError("Attachment {0} has a different length than the values".format(key))
+                attachment.data.extend(attachmentValues)
+        self.data.extend(values)
+
+    def take(self, indices):
+        """
+        Return the rows at *indices* as tuple `(values, attachments)`,
+        which can be passed to :meth:`rawExtend` of another column.
+        """
+        if self.numeric:
+            indices = np.asarray(indices, dtype=np.intp)
+            return self.dataArray()[indices], dict(
+                (key, self.attachmentArray(key)[indices])
+                for key in self.attachments)
+        data = self.data
+        values = [data[i] for i in indices]
+        attachments = dict(
+            (key, [attachment.data[i] for i in indices])
+            for key, attachment in self.attachments.iteritems())
+        return values, attachments
+
+    def dataArray(self):
+        """
+        Return the values of the column as one-dimensional float array.
+        For numeric columns, the array shares the memory of the column.
+        """
+        if self.numeric:
+            return self.data.view()
+        return np.array(self.data, dtype=np.float64)
+
+    def attachmentArray(self, key):
+        """
+        Return the values of the attachment *key* as one-dimensional
+        float array. Raises a *KeyError* if the attachment is not
+        declared in the column.
+        """
+        if self.numeric:
+            return self.attachments[key].data.view()
+        return np.array(self.attachments[key].data, dtype=np.float64)
+
+    def __array__(self, dtype=None):
+        # numpy array protocol: `np.asarray(column)` gives the values
+        # without copying for numeric columns (see :meth:`dataArray`)
+        array = self.dataArray()
+        if dtype is None:
+            return array
+        return array.astype(dtype, copy=False)
+
     def __getitem__(self, index):
         v = [self.data[index]]
         v.append(
@@ -285,6 +441,74 @@ class Column(object):
         value, stddev = StatUtils.mean(self.data)
         return value * self.unitExpr, stddev * self.unitExpr
 
+    def sigmaClip(self, nsigma=3, maxiters=5, center="median"):
+        """
+        Reject outliers from the values of the column using
+        :func:`StatUtils.sigma_clip` and return its result, which
+        includes the boolean row mask of the values which were kept.
+        """
+        return StatUtils.sigma_clip(
+            self.dataArray(),
+            nsigma=nsigma,
+            maxiters=maxiters,
+            center=center)
+
+    def weightedMean(self, key=ValueClasses.StatisticalUncertainty, scale=False):
+        """
+        Combine all values of the column into their inverse-variance
+        weighted mean, using the attachment *key* as uncertainty of
+        each value. See :func:`combine` for the meaning of *scale* and
+        the return value.
+        """
+        return combine([self], key=key, scale=scale)
+
+    def convert(self, unit, inPlace=False, symbol=None):
+        """
+        Convert the column into the compatible *unit*, which may be
+        given in any form accepted by the constructor. The conversion
+        factor is computed once and the values and all attachments are
+        rescaled with one array operation each.
+
+        If *inPlace* is *True*, the column itself is converted and
+        returned. Otherwise, a new :cls:`MeasurementColumn` holding the
+        converted copy is returned; it uses *symbol* or, if that is
+        *None*, the symbol of this column.
+
+        Raises a *ValueError* if the units are not compatible.
+        """
+        unit, unitExpr = parseUnit(unit)
+        factor = conversionFactor(self.unitExpr, unitExpr)
+        if inPlace:
+            self.unit, self.unitExpr = unit, unitExpr
+            self._rescale(factor)
+            return self
+        column = MeasurementColumn(
+            symbol if symbol is not None else self.symbol,
+            (unit, unitExpr),
+            magnitude=self.magnitude,
+            numeric=self.numeric
+        )
+        for key in self.attachments:
+            column.newAttachment(key, default=0)
+        column.rawExtend(
+            self.dataArray() * factor,
+            dict((key, self.attachmentArray(key) * factor)
+                 for key in self.attachments))
+        return column
+
+    def _rescale(self, factor):
+        """
+        Multiply the values and all attachments with *factor*, reusing
+        the existing storage.
+        """
+        if self.numeric:
+            for array in [self.dataArray()] + list(map(self.attachmentArray, self.attachments)):
+                np.multiply(array, factor, out=array)
+            return
+        self.data[:] = (self.dataArray() * factor).tolist()
+        for key, attachment in self.attachments.iteritems():
+            attachment.data[:] = (self.attachmentArray(key) * factor).tolist()
+
 
 class MeasurementColumn(Column):
     """
@@ -354,12 +578,31 @@ class DerivatedColumn(Column):
 
     *sources* must be an iterable of columns on which the given
     expression depends.
+
+    *propagation* may be an :class:`ErrorPropagation.Propagation`
+    object. If it is given, the column is calculated on float arrays
+    using that propagation strategy. By default, each row is evaluated
+    exactly using sympy with gaussian error propagation.
+
+    *numeric* defaults to *True* if all sources are numeric (see
+    :cls:`Column`). Numeric columns are always calculated on float
+    arrays, using :class:`ErrorPropagation.GaussianPropagation` if no
+    *propagation* is given.
     """
     
-    def __init__(self, symbol, unit, sources, expression, magnitude=1, **kwargs):
-        super(DerivatedColumn, self).__init__(symbol, unit, magnitude=magnitude)
-        self.sources = frozenset(sources)
+    def __init__(self, symbol, unit, sources, expression, magnitude=1,
+            propagation=None, numeric=None, **kwargs):
+        sources = frozenset(sources)
+        if numeric is None:
+            numeric = bool(sources) and all(source.numeric for source in sources)
+        super(DerivatedColumn, self).__init__(symbol, unit,
+            magnitude=magnitude,
+            numeric=numeric)
+        self.sources = sources
         self.expression = expression
+        if numeric and propagation is None:
+            propagation = ErrorPropagation.GaussianPropagation()
+        self.propagation = propagation
 
     def getSources(self):
         return frozenset(self.sources)
@@ -373,6 +616,9 @@ class DerivatedColumn(Column):
                 if len(source) == 0:
                     source.update()
         self.clear()
+        if self.propagation is not None:
+            self._updatePropagated()
+            return
         iterator = ColumnsIterator(self.sources)
         unitfreeExpr = self.expression.subs(iterator.units) / self.unitExpr
         attachments = iterator.attachments
@@ -390,10 +636,78 @@ class DerivatedColumn(Column):
                 attachmentDict[key] = sympyUtils.setUndefinedTo(errorExpr.subs(valueSubs).subs(attachmentSubs[key]), 0)
             self.rawAppend(value, attachmentDict)
 
+    def canShare(self):
+        """
+        Return whether the column can be calculated together with other
+        columns by :func:`updateShared`. Columns without sources cannot,
+        as the number of rows to calculate is taken from the sources.
+        """
+        return (bool(self.sources) and self.propagation is not None
+                and self.propagation.usesJacobian)
+
+    def _propagationInputs(self):
+        """
+        Return the arguments for :meth:`ErrorPropagation.Propagation.propagate`
+        as tuple `(expr, symbols, values, attachments, units)`.
+        """
+        sources = list(self.sources)
+        if not sources:
+            raise ValueError(
+                "Column {0} has no sources to take the number of rows from".format(self.symbol))
+        keys = set()
+        for source in sources:
+            keys.update(source.attachments.iterkeys())
+        length = len(sources[0])
+        attachments = dict(
+            (key, [source.attachmentArray(key) if key in source.attachments
+                   else np.zeros(length)
+                   for source in sources])
+            for key in keys)
+        return (numericExpression(self.expression, sources, self.unitExpr),
+                [source.symbol for source in sources],
+                [source.dataArray() for source in sources],
+                attachments,
+                [source.unitExpr for source in sources])
+
+    def _storePropagated(self, values, propagated):
+        for key in propagated:
+            self.newAttachment(key, default=0)
+        self.rawExtend(values, propagated)
+
+    def _updatePropagated(self):
+        self._storePropagated(*self.propagation.propagate(*self._propagationInputs()))
+
+    def errorBudget(self, key=ValueClasses.StatisticalUncertainty):
+        """
+        Report which inputs dominate the uncertainty *key* of the
+        column. Requires the column to be calculated with a propagation
+        which attaches :class:`ValueClasses.Contribution` keys, like
+        :class:`ErrorPropagation.GaussianPropagation` with `budget=True`.
+
+        Return a dict mapping the symbol of each input to its share of
+        the summed squared contributions over all rows.
+        """
+        contributions = dict(
+            (attachmentKey.symbol, (self.attachmentArray(attachmentKey)**2).sum())
+            for attachmentKey in self.attachments
+            if isinstance(attachmentKey, ValueClasses.Contribution)
+            and attachmentKey.key == key)
+        if not contributions:
+            raise ValueError("No error budget for {0} attached to column {1}".format(key, self.symbol))
+        total = sum(contributions.itervalues())
+        return dict((symbol, (value / total if total else 0.))
+                    for symbol, value in contributions.iteritems())
+
 
 class ConstColumn(Column):
+    """
+    A column which repeats one *value*, with the fixed *attachments*,
+    *length* times. It counts as numeric, as it can be used in numeric
+    calculations without loss.
+    """
+
     def __init__(self, symbol, unit, value, attachments, length, magnitude=1, **kwargs):
-        super(ConstColumn, self).__init__(symbol, unit, magnitude=magnitude)
+        super(ConstColumn, self).__init__(symbol, unit, magnitude=magnitude, numeric=True)
         self.value = value / self.unitExpr
         if attachments:
             self.attachments = dict((key, value / self.unitExpr) for key, value in attachments.iteritems())
@@ -405,5 +719,143 @@ class ConstColumn(Column):
         while True:
             yield (self.value, dict(self.attachments))
 
+    def take(self, indices):
+        count = len(indices)
+        return [self.value] * count, dict(
+            (key, [value] * count) for key, value in self.attachments.iteritems())
+
+    def dataArray(self):
+        return np.repeat(np.float64(self.value), self.length)
+
+    def attachmentArray(self, key):
+        return np.repeat(np.float64(self.attachments[key]), self.length)
+
+    def _rescale(self, factor):
+        self.value = float(self.value) * factor
+        for key, value in self.attachments.iteritems():
+            self.attachments[key] = float(value) * factor
+
     def __len__(self):
         return self.length
+
+
+def updateShared(columns, blockSize=2**16):
+    """
+    Calculate the :cls:`DerivatedColumn` objects *columns* together.
+    All columns must be able to share (see
+    :meth:`DerivatedColumn.canShare`), have sources of equal length and
+    their sources must be up to date.
+
+    The values and Jacobians of all columns are compiled into one
+    program (see :func:`sympyUtils.compileExpressions`), so
+    subexpressions which occur in several columns or in their error
+    terms are evaluated only once per block of *blockSize* rows.
+    """
+    inputs = [column._propagationInputs() for column in columns]
+    symbols, arrays, exprs = [], [], []
+    for expr, columnSymbols, values, _, _ in inputs:
+        for symbol, value in zip(columnSymbols, values):
+            if symbol not in symbols:
+                symbols.append(symbol)
+                arrays.append(value)
+        exprs.append(expr)
+        exprs.extend(StatUtils.diff(expr, symbol) for symbol in columnSymbols)
+    length = len(arrays[0])
+    if any(len(array) != length for array in arrays):
+        raise ValueError("Columns calculated together must have sources of equal length")
+
+    program = sympyUtils.compileExpressions(exprs, symbols)
+    outputs = np.empty((len(exprs), length))
+    for start in range(0, length, blockSize):
+        block = slice(start, start + blockSize)
+        outputs[:, block] = program(*[array[block] for array in arrays])
+
+    offset = 0
+    for column, (_, columnSymbols, _, attachments, units) in zip(columns, inputs):
+        count = len(columnSymbols)
+        result = outputs[offset]
+        jacobian = outputs[offset+1:offset+1+count]
+        offset += count + 1
+        column.clear()
+        column._storePropagated(*column.propagation.combine(
+            result, jacobian, columnSymbols, attachments, units))
+
+
+def numericExpression(expression, sources, unitExpr):
+    """
+    Return the plain numeric form of *expression*, which references the
+    columns *sources* by their symbols, for calculating values in units
+    of *unitExpr*. The symbols in the result stand for the unitless
+    values of the columns.
+    """
+    unitfreeExpr = expression.subs(
+        [(source.symbol, source.symbol * source.unitExpr) for source in sources]
+    ) / unitExpr
+    return sympyUtils.removeUnits(unitfreeExpr)
+
+
+def parseUnit(unit):
+    """
+    Return the tuple `(name, unitExpr)` for *unit*, which may be given
+    in any of the forms described for :cls:`Column`.
+    """
+    if isinstance(unit, (unicode, str)):
+        return unit, Units.parseString(unit)
+    if isinstance(unit, sp.Expr):
+        return str(unit), unit
+    try:
+        name, unitExpr = unit
+    except (TypeError, ValueError):
+        return str(unit), unit
+    return name, unitExpr
+
+
+def conversionFactor(fromUnit, toUnit):
+    """
+    Return the float factor which converts values in units of
+    *fromUnit* into values in units of *toUnit*. Raises a *ValueError*
+    if the units are not compatible.
+    """
+    try:
+        return Units.parse(fromUnit).conversionFactor(Units.parse(toUnit))
+    except Units.UnsupportedExpression:
+        pass
+    factor = sp.sympify(fromUnit / toUnit)
+    if not factor.is_Number:
+        raise ValueError("Unit {0} is not compatible with {1}".format(fromUnit, toUnit))
+    return float(factor)
+
+
+def combine(columns, key=ValueClasses.StatisticalUncertainty, scale=False):
+    """
+    Combine all values of *columns*, which may belong to different
+    tables, into one inverse-variance weighted mean using
+    :func:`StatUtils.weighted_mean`. The attachment *key* is used as
+    uncertainty of each value and must be declared in all columns.
+    The values are converted into the unit of the first column, so the
+    units of all columns must be compatible.
+
+    If *scale* is *True*, the uncertainty of the result is scaled by
+    the Birge ratio if that is larger than one.
+
+    Return the tuple `(value, attachments, result)`. *value* and
+    *attachments* include the unit and can be passed directly to
+    :meth:`Table.const`; *result* is the unitless
+    :class:`StatUtils.WeightedMean` including the consistency check.
+    """
+    columns = list(columns)
+    unitExpr = columns[0].unitExpr
+    values, errors = [], []
+    for column in columns:
+        if key not in column.attachments:
+            raise KeyError("Column {0} has no attachment {1}".format(column.symbol, key))
+        factor = conversionFactor(column.unitExpr, unitExpr)
+        values.append(column.dataArray() * factor)
+        errors.append(column.attachmentArray(key) * factor)
+    result = StatUtils.weighted_mean(
+        np.concatenate(values),
+        np.concatenate(errors),
+        scale=scale)
+    return (float(result.mean) * unitExpr,
+            {key: float(result.error) * unitExpr},
+            result)
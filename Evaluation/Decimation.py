@@ -0,0 +1,97 @@
+# encoding=utf-8
+"""
+Reduce long series to a number of points suitable for plotting while
+preserving their visual shape.
+
+All functions take the coordinate arrays *x* and *y* of a series
+(sorted by *x*) and the target point *count* and return the sorted
+array of the indices of the kept points, so that the attachments of the
+kept points can be taken along (see :meth:`Table.Table.decimate`).
+"""
+from __future__ import unicode_literals, division, print_function
+from our_future import *
+
+import numpy as np
+
+def lttb(x, y, count):
+    """
+    Largest-triangle-three-buckets downsampling. The first and the last
+    point are always kept; the points in between are split into
+    `count - 2` buckets and from each bucket the point is kept which
+    spans the largest triangle with the point kept from the previous
+    bucket and the mean of the next bucket.
+
+    The bucket means are computed in one vectorized pass; only the
+    selection, which depends on the previous choice, runs per bucket.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    length = len(x)
+    if count >= length:
+        return np.arange(length)
+    if count < 3:
+        raise ValueError("LTTB needs a target count of at least 3")
+
+    edges = np.linspace(1, length - 1, count - 1).astype(int)
+    sizes = np.diff(edges)
+    sumX = np.concatenate(([0.], np.cumsum(x)))
+    sumY = np.concatenate(([0.], np.cumsum(y)))
+    meanX = (sumX[edges[1:]] - sumX[edges[:-1]]) / sizes
+    meanY = (sumY[edges[1:]] - sumY[edges[:-1]]) / sizes
+    # each bucket looks at the mean of the next one, the last bucket at
+    # the last point
+    nextX = np.append(meanX[1:], x[-1])
+    nextY = np.append(meanY[1:], y[-1])
+
+    indices = np.empty(count, dtype=np.intp)
+    indices[0], indices[-1] = 0, length - 1
+    previous = 0
+    for i in range(count - 2):
+        lo, hi = edges[i], edges[i+1]
+        px, py = x[previous], y[previous]
+        areas = np.abs((px - nextX[i]) * (y[lo:hi] - py) - (px - x[lo:hi]) * (nextY[i] - py))
+        previous = lo + int(np.argmax(areas))
+        indices[i+1] = previous
+    return indices
+
+def minmax(x, y, count):
+    """
+    Per-bucket minimum/maximum downsampling. The points are split into
+    `count // 2` buckets of equal size and the points with the minimum
+    and the maximum *y* of each bucket are kept, along with the first
+    and the last point. This preserves the envelope of the series
+    exactly and is fully vectorized; *x* is only used for its length.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    length = len(y)
+    if count >= length:
+        return np.arange(length)
+    if count < 2:
+        raise ValueError("Min/max decimation needs a target count of at least 2")
+
+    size = -(-length // (count // 2))
+    buckets = -(-length // size)
+    offsets = np.arange(buckets) * size
+    padded = np.empty(buckets * size)
+    padded[:length] = y
+    padded[length:] = np.inf
+    lows = offsets + padded.reshape(buckets, size).argmin(axis=1)
+    padded[length:] = -np.inf
+    highs = offsets + padded.reshape(buckets, size).argmax(axis=1)
+    return np.unique(np.concatenate((lows, highs, [0, length - 1])))
+
+METHODS = {
+    "lttb": lttb,
+    "minmax": minmax,
+}
+"""Decimation functions by name."""
+
+def decimate(x, y, count, method="lttb"):
+    """
+    Return the indices of the points kept by reducing the series to
+    about *count* points using *method*, one of the names in
+    :data:`METHODS` or a function with the same signature.
+    """
+    if not callable(method):
+        method = METHODS[method]
+    return method(x, y, count)
@@ -1,6 +1,16 @@
 # encoding=utf-8
+from __future__ import division, unicode_literals, print_function
+from our_future import *
+
+import abc
 
 import sympy
+import numpy as np
+
+import sympyUtils
+
+import StatUtils
+import ValueClasses
 
 def propagate(formula, *vars):
     """
@@ -15,6 +25,187 @@ def propagate(formula, *vars):
     res = 0
 
     for var, err in vars:
-        res += err ** 2 * sympy.diff(formula, var) ** 2
+        res += err ** 2 * StatUtils.diff(formula, var) ** 2
 
     return sympy.sqrt(res)
+
+
+class Propagation(object):
+    """
+    Base class for numeric error propagation strategies, which can be
+    passed as *propagation* to :cls:`Column.DerivatedColumn` (or
+    :meth:`Table.derivate`) to replace the exact row-by-row evaluation
+    with sympy by a vectorized evaluation on float arrays.
+
+    Strategies which set :attr:`usesJacobian` implement :meth:`combine`.
+    The values and Jacobians of several such columns can then be
+    calculated together by :func:`Column.updateShared`.
+    """
+
+    __metaclass__ = abc.ABCMeta
+    usesJacobian = False
+
+    @abc.abstractmethod
+    def propagate(self, expr, symbols, values, attachments, units):
+        """
+        Evaluate the unitless sympy expression *expr* for all rows and
+        propagate the uncertainties of the inputs.
+
+        *symbols* is the list of symbols used in *expr*, *values* the
+        list of float arrays holding the values of the symbols (in the
+        same order) and *attachments* a dict mapping each attachment key
+        to a list of float arrays holding the uncertainties of the
+        symbols. *units* is the list of the unit expressions in which
+        the values are given.
+
+        Return a tuple of the float array of results and a dict mapping
+        attachment keys to the float arrays of propagated
+        uncertainties.
+        """
+
+
+class GaussianPropagation(Propagation):
+    """
+    First-order gaussian error propagation, evaluated for all rows at
+    once using the compiled expression and its compiled Jacobian.
+
+    *covariance* may be a dict mapping pairs of symbols to the
+    covariance of the two inputs. A covariance may be given including
+    units; plain numbers are taken in the units of the two columns. It
+    may also be an array with one covariance per row. The covariances
+    are applied when propagating the uncertainty *covarianceKey*; all
+    other uncertainties are propagated as uncorrelated.
+
+    This allows to use correlated fit outputs, like slope and
+    intercept, in derivations without overestimating the uncertainty.
+
+    If *budget* is *True*, the contribution `|df/dx * dx|` of each input
+    `x` to each propagated uncertainty is attached as well, using
+    :class:`ValueClasses.Contribution` keys (see
+    :meth:`Column.DerivatedColumn.errorBudget`). Contributions from
+    covariances are not attributed to either input.
+    """
+
+    usesJacobian = True
+
+    def __init__(self, covariance={}, covarianceKey=ValueClasses.StatisticalUncertainty,
+            budget=False):
+        self.covariance = dict(covariance)
+        self.covarianceKey = covarianceKey
+        self.budget = budget
+
+    def _covariances(self, symbols, units):
+        """
+        Yield the tuples `(i, j, covariance)` of symbol indices and the
+        unitless covariance for all covariances given for *symbols*.
+        """
+        indices = dict((symbol, i) for i, symbol in enumerate(symbols))
+        for (a, b), covariance in self.covariance.iteritems():
+            if a not in indices or b not in indices:
+                continue
+            i, j = indices[a], indices[b]
+            if isinstance(covariance, sympy.Basic):
+                factor = sympy.sympify(covariance / (units[i] * units[j]))
+                if not factor.is_Number:
+                    raise ValueError("Unit of covariance of {0} and {1} does not match".format(a, b))
+                covariance = float(factor)
+            yield i, j, np.asarray(covariance, dtype=np.float64)
+
+    def propagate(self, expr, symbols, values, attachments, units):
+        values = [np.asarray(value, dtype=np.float64) for value in values]
+        result = sympyUtils.compileExpression(expr, symbols)(*values)
+        jacobian = StatUtils.compile_jacobian(expr, symbols)(*values)
+        return self.combine(result, jacobian, symbols, attachments, units)
+
+    def combine(self, result, jacobian, symbols, attachments, units):
+        """
+        Propagate the uncertainties, given the already evaluated
+        *result* and *jacobian* (with the symbols along the first axis).
+        The other arguments and the return value are the same as for
+        :meth:`propagate`.
+        """
+        propagated = {}
+        for key, errors in attachments.iteritems():
+            terms = jacobian * np.array(errors, dtype=np.float64)
+            variance = (terms**2).sum(axis=0)
+            if key == self.covarianceKey:
+                for i, j, covariance in self._covariances(symbols, units):
+                    variance += 2 * jacobian[i] * jacobian[j] * covariance
+            propagated[key] = np.sqrt(variance)
+            if self.budget:
+                for symbol, term in zip(symbols, terms):
+                    propagated[ValueClasses.Contribution(key, symbol)] = np.abs(term)
+        return result, propagated
+
+
+class MonteCarloPropagation(Propagation):
+    """
+    Propagate uncertainties by sampling each input from a normal
+    distribution around its value, with the uncertainty as standard
+    deviation, and evaluating the compiled expression on all samples at
+    once. The column value is the expression evaluated on the input
+    values; the standard deviation of the results is attached under the
+    key of the propagated uncertainty. As in gaussian propagation, each
+    attachment key is propagated on its own.
+
+    *samples* is the number of samples drawn per row and *seed* seeds
+    the random number generator.
+
+    *percentiles* may be a sequence of percentiles (0 to 100) of the
+    results to attach as well, using :class:`ValueClasses.Percentile`
+    keys. Their values are the offsets of the percentiles from the
+    column value.
+
+    The samples are processed in blocks of at most *blockSize* cells
+    per input. When percentiles are requested, all samples of a row
+    must be held at once, so blocks contain at least *samples* cells.
+    """
+
+    def __init__(self, samples=10000, seed=None, percentiles=(), blockSize=2**20):
+        self.samples = samples
+        self.seed = seed
+        self.percentiles = list(percentiles)
+        self.blockSize = blockSize
+
+    def propagate(self, expr, symbols, values, attachments, units):
+        func = sympyUtils.compileExpression(expr, symbols)
+        values = [np.asarray(value, dtype=np.float64) for value in values]
+        result = func(*values)
+        rows = len(result)
+
+        random = np.random.RandomState(self.seed)
+        if self.percentiles:
+            chunk = self.samples
+        else:
+            chunk = min(self.samples, self.blockSize)
+        rowBlock = max(1, self.blockSize // chunk)
+
+        propagated = {}
+        for key, errors in attachments.iteritems():
+            errors = [np.asarray(error, dtype=np.float64) for error in errors]
+            stddev = np.zeros(rows)
+            offsets = np.zeros((len(self.percentiles), rows))
+            for start in range(0, rows, rowBlock):
+                block = slice(start, min(rows, start + rowBlock))
+                acc = StatUtils.Accumulator()
+                done = 0
+                while done < self.samples:
+                    count = min(chunk, self.samples - done)
+                    inputs = []
+                    for value, error in zip(values, errors):
+                        value, error = value[block, np.newaxis], error[block, np.newaxis]
+                        if error.any():
+                            value = value + error * random.standard_normal(
+                                (len(value), count))
+                        inputs.append(value)
+                    evaluated = func(*inputs) + np.zeros((len(result[block]), count))
+                    acc.push_block(evaluated, axis=1)
+                    if self.percentiles:
+                        offsets[:, block] = np.percentile(
+                            evaluated, self.percentiles, axis=1) - result[block]
+                    done += count
+                stddev[block] = acc.stddev
+            propagated[key] = stddev
+            for percentile, offset in zip(self.percentiles, offsets):
+                propagated[ValueClasses.Percentile(key, percentile)] = offset
+        return result, propagated
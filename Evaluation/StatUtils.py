@@ -1,10 +1,20 @@
-from __future__ import print_function
+from __future__ import print_function, division
 
-__all__ = ["mean", "propagate_eval"]
+__all__ = ["mean", "Accumulator", "array_mean", "weighted_mean",
+           "sigma_clip", "propagate_eval", "propagate_eval_batch",
+           "propagate_covariance", "array_digit_rounding",
+           "array_error_rounding", "array_multi_error_rounding",
+           "format_fixed"]
 
+import collections
 import sympy as sp
+import numpy as np
 import math
 
+import utils
+import sympyUtils
+import Units
+
 def mean(data):
     """
     Calculate the arithmetic mean an standard deviation of the values
@@ -28,6 +38,312 @@ def mean(data):
 
     return res, sp.sqrt((res2 - res**2)/(count-1))
 
+class Accumulator(object):
+    """
+    Single-pass accumulator for the mean and the variance of a stream of
+    values, using the numerically stable update of Welford.
+
+    The accumulator works on plain floats or, elementwise, on numpy
+    arrays of any fixed shape (e.g. when pushing the rows of an array
+    one after another). Accumulators can be merged using :meth:`merge`,
+    so partial results from chunks or other processes can be combined
+    without touching the data again.
+
+    *count*, *mean* and *m2* can be given to restore the state of an
+    accumulator, for example after transferring it to another process.
+    *m2* is the sum of the squared differences from the mean.
+    """
+
+    def __init__(self, count=0, mean=0., m2=0.):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    @classmethod
+    def from_array(cls, data, axis=0):
+        """
+        Create an accumulator holding the statistics of *data* along
+        *axis*, reduced in one vectorized pass.
+        """
+        data = np.asarray(data, dtype=np.float64)
+        count = data.shape[axis]
+        if count == 0:
+            return cls()
+        mean = data.mean(axis=axis)
+        m2 = ((data - np.expand_dims(mean, axis))**2).sum(axis=axis)
+        return cls(count, mean, m2)
+
+    def push(self, value):
+        """
+        Add a single value (or, elementwise, an array of values) to the
+        accumulator.
+        """
+        if isinstance(value, np.ndarray):
+            value = value.astype(np.float64)
+        else:
+            value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean = self.mean + delta / self.count
+        self.m2 = self.m2 + delta * (value - self.mean)
+
+    def extend(self, iterable):
+        """
+        :meth:`push` all values from *iterable*.
+        """
+        for value in iterable:
+            self.push(value)
+
+    def push_block(self, data, axis=0):
+        """
+        Add a whole block of values at once. The block is reduced along
+        *axis* using :meth:`from_array` and merged into the accumulator.
+        """
+        self.merge(type(self).from_array(data, axis=axis))
+
+    def merge(self, other):
+        """
+        Merge the state of the accumulator *other* into this one, as if
+        all values pushed to *other* had been pushed here. Return
+        *self*.
+        """
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / count)
+        self.m2 = self.m2 + other.m2 + delta**2 * (self.count * other.count / count)
+        self.count = count
+        return self
+
+    def __add__(self, other):
+        return type(self)(self.count, self.mean, self.m2).merge(other)
+
+    @property
+    def variance(self):
+        """
+        Sample variance of the values pushed so far. It is undefined
+        (*nan*) for less than two values.
+        """
+        if self.count < 2:
+            return np.full(np.shape(self.m2), np.nan)[()]
+        return self.m2 / (self.count - 1)
+
+    @property
+    def stddev(self):
+        """
+        Sample standard deviation of the values pushed so far.
+        """
+        return np.sqrt(self.variance)
+
+    @property
+    def stddev_of_mean(self):
+        """
+        Standard deviation of the mean of the values pushed so far.
+        """
+        return np.sqrt(self.variance / max(self.count, 1))
+
+    def result(self):
+        """
+        Return the tuple `(mean, stddev)` with the same meaning as the
+        result of :func:`mean`, but as floats (or float arrays).
+        """
+        return self.mean, self.stddev_of_mean
+
+
+def array_mean(data, axis=-1):
+    """
+    Vectorized variant of :func:`mean`. Reduce *data* along *axis*
+    (by default, every row of a two-dimensional array is reduced) and
+    return the tuple `(mean, stddev)` of float arrays.
+    """
+    return Accumulator.from_array(data, axis=axis).result()
+
+WeightedMean = collections.namedtuple(
+    "WeightedMean",
+    ["mean", "error", "chi2", "ndof", "birge"])
+
+
+def weighted_mean(values, errors, axis=-1, scale=False):
+    """
+    Combine independent determinations *values* with the uncertainties
+    *errors* into their inverse-variance weighted mean. Both must be
+    array-like of the same shape and are reduced along *axis*.
+
+    Return a :class:`WeightedMean` tuple `(mean, error, chi2, ndof,
+    birge)`, where *chi2* is the chi-square of the values with respect
+    to the mean, *ndof* the number of degrees of freedom and *birge*
+    the Birge ratio `sqrt(chi2 / ndof)`. A Birge ratio much larger than
+    one indicates that the determinations are not consistent within
+    their uncertainties.
+
+    If *scale* is *True*, the error of the mean is multiplied by the
+    Birge ratio wherever it is larger than one.
+
+    All *errors* must be positive and finite; a value without
+    uncertainty would take all the weight, so :class:`ValueError` is
+    raised for zero errors instead of returning a nan mean.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    errors = np.asarray(errors, dtype=np.float64)
+    if values.shape != errors.shape:
+        raise ValueError("values and errors must have the same shape")
+    if not (np.isfinite(errors).all() and (errors > 0).all()):
+        raise ValueError("errors must be positive and finite")
+    weights = 1 / errors**2
+    weight_sum = weights.sum(axis=axis)
+    mean = (weights * values).sum(axis=axis) / weight_sum
+    error = 1 / np.sqrt(weight_sum)
+    ndof = values.shape[axis] - 1
+    chi2 = (weights * (values - np.expand_dims(mean, axis))**2).sum(axis=axis)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        birge = np.sqrt(chi2 / ndof) if ndof > 0 else chi2 * np.nan
+    if scale:
+        error = error * np.where(birge > 1, birge, 1)
+    return WeightedMean(mean, error, chi2, ndof, birge)
+
+SigmaClip = collections.namedtuple(
+    "SigmaClip",
+    ["mask", "mean", "stddev", "count", "iterations"])
+
+
+def sigma_clip(values, nsigma=3, maxiters=5, center="median"):
+    """
+    Iteratively reject outliers from the one-dimensional array-like
+    *values*. In each iteration, all values which deviate more than
+    *nsigma* standard deviations from the center of the remaining
+    sample are rejected. *center* may be ``"median"`` or ``"mean"``.
+
+    Iteration stops when no more values are rejected or after
+    *maxiters* iterations (*None* means no limit). Non-finite values are
+    always rejected.
+
+    Return a :class:`SigmaClip` tuple `(mask, mean, stddev, count,
+    iterations)`. *mask* is a boolean array which is *True* for all
+    values which have been kept; *mean*, *stddev* and *count* are the
+    statistics of the kept values.
+    """
+    if center == "median":
+        center_func = np.median
+    elif center == "mean":
+        center_func = np.mean
+    else:
+        raise ValueError("Unknown center: {0}".format(center))
+
+    values = np.asarray(values, dtype=np.float64)
+    mask = np.isfinite(values)
+    count = np.count_nonzero(mask)
+    iterations = 0
+    while (maxiters is None or iterations < maxiters) and count > 1:
+        sample = values[mask]
+        limit = nsigma * sample.std(ddof=1)
+        # only the kept values are compared, so non-finite ones are
+        # never touched
+        mask[mask] = np.abs(sample - center_func(sample)) <= limit
+        iterations += 1
+        new_count = np.count_nonzero(mask)
+        if new_count == count:
+            break
+        count = new_count
+
+    acc = Accumulator.from_array(values[mask])
+    return SigmaClip(mask, acc.mean, acc.stddev, acc.count, iterations)
+
+CacheInfo = collections.namedtuple(
+    "CacheInfo",
+    ["hits", "misses", "maxsize", "currsize"])
+
+
+class ExpressionCache(object):
+    """
+    Least-recently-used cache for expressions derived from other sympy
+    expressions, like derivatives. At most *maxsize* entries are kept.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, factory):
+        """
+        Return the entry for *key*. If there is none, it is created by
+        calling *factory* without arguments and stored.
+        """
+        try:
+            value = self._entries.pop(key)
+            self.hits += 1
+        except KeyError:
+            value = factory()
+            self.misses += 1
+        self._entries[key] = value
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return value
+
+    def info(self):
+        """
+        Return a :class:`CacheInfo` tuple with the hit and miss
+        statistics of the cache.
+        """
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def clear(self):
+        """
+        Drop all entries and reset the statistics.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+derivative_cache = ExpressionCache()
+"""Process-wide cache of derivatives, used by :func:`diff`."""
+
+error_cache = ExpressionCache()
+"""Process-wide cache of error propagation terms, used by
+:func:`buildErrorTerms`."""
+
+# placeholders for the error symbols in cached error terms; error symbols
+# are usually fresh dummies, so they must not be part of the cache key
+_error_placeholders = []
+
+def _get_error_placeholders(count):
+    while len(_error_placeholders) < count:
+        _error_placeholders.append(sp.Dummy(b"error_placeholder"))
+    return _error_placeholders[:count]
+
+def diff(expr, symbol):
+    """
+    Return the derivative of *expr* with respect to *symbol*, using
+    :data:`derivative_cache`.
+    """
+    return derivative_cache.get((expr, symbol), lambda: sp.diff(expr, symbol))
+
+def buildErrorTerms(expr, symbols):
+    """
+    Return the list of the squared contributions `(df/dx * dx)**2` of
+    each symbol tuple in *symbols* to the gaussian error propagation of
+    *expr*, in the order of *symbols*. See
+    :func:`buildErrorExpression` for the meaning of the arguments.
+
+    The terms are cached in :data:`error_cache`, keyed by *expr* and the
+    value symbols only, so that fresh error symbols still hit the cache.
+    """
+    symbols = list(symbols)
+    placeholders = _get_error_placeholders(len(symbols))
+    values = tuple(symbol for symbol, _ in symbols)
+    terms = error_cache.get(
+        (expr, values),
+        lambda: [(diff(expr, symbol) * placeholder)**2
+                 for symbol, placeholder in zip(values, placeholders)])
+    return [term.subs(placeholder, dsymbol)
+            for term, placeholder, (_, dsymbol) in zip(terms, placeholders, symbols)]
+
 def buildErrorExpression(expr, symbols):
     """
     Take a sympy *expr* and a set of symbol tuples and return a gaussian
@@ -38,10 +354,7 @@ def buildErrorExpression(expr, symbols):
     *dsymbol* is the symbol which references a (possibly estimated)
     error value.
     """
-    diffs = 0
-    for symbol, dsymbol in symbols:
-        diffs += (sp.diff(expr, symbol) * dsymbol)**2
-    return sp.sqrt(diffs)
+    return sp.sqrt(sum(buildErrorTerms(expr, symbols), 0))
 
 def propagate_eval(expr, values, out_unit=None):
     """
@@ -76,6 +389,89 @@ def propagate_eval(expr, values, out_unit=None):
 
     return result_value, error_value
 
+def propagate_eval_batch(expr, values, out_unit=None):
+    """
+    Vectorized variant of :func:`propagate_eval` for many sets of values.
+    The value and error expressions are built and compiled only once.
+
+    *values* must be an iterable of tuples like for
+    :func:`propagate_eval`, but the value and the error in each tuple
+    may be arrays (one entry per set of values). The unit expressions
+    must be plain units.
+
+    If *out_unit* is given, the results are calculated in that unit and
+    a *ValueError* is raised if the units do not match. Otherwise, they
+    are given in the SI base units which sympy uses to express all
+    units.
+
+    Return a tuple of the float arrays of the results and of the
+    propagated errors.
+    """
+    values = list(values)
+    symbols = [symb for symb, _, _, _ in values]
+    numeric = expr.subs([(symb, symb*unit) for symb, _, _, unit in values])
+    if out_unit is not None:
+        numeric = numeric / out_unit
+        test = numeric.subs([(symb, 1) for symb in symbols])
+        if not utils.empty(sympyUtils.iterUnits(test)):
+            raise ValueError("Unit of expression does not match out_unit.")
+    else:
+        try:
+            numeric = numeric / sympyUtils.siDimension(numeric).toExpr()
+        except Units.UnsupportedExpression:
+            pass
+    numeric = sympyUtils.removeUnits(numeric)
+
+    arguments = [np.asarray(value, dtype=np.float64) for _, value, _, _ in values]
+    errors = np.array(np.broadcast_arrays(*[
+        np.asarray(error, dtype=np.float64) for _, _, error, _ in values]))
+    result = sympyUtils.compileExpression(numeric, symbols)(*arguments)
+    jacobian = compile_jacobian(numeric, symbols)(*arguments)
+    return result, np.sqrt(((jacobian * errors)**2).sum(axis=0))
+
+def compile_jacobian(expr, symbols):
+    """
+    Compile the partial derivatives of *expr* with respect to each of
+    the *symbols* (see :func:`sympyUtils.compileExpression`). Return a
+    function which takes one value (or array) per symbol and returns
+    the float array of the derivatives, with the symbols along the
+    first axis.
+    """
+    symbols = list(symbols)
+    derivatives = [sympyUtils.compileExpression(diff(expr, symbol), symbols)
+                   for symbol in symbols]
+
+    def jacobian(*values):
+        return np.array([derivative(*values) for derivative in derivatives])
+    return jacobian
+
+def propagate_covariance(expr, symbols, values, covariance):
+    """
+    Evaluate *expr* and propagate the uncertainties of possibly
+    correlated inputs, for all rows at once, as `J * S * J^T` with the
+    Jacobian `J` and the covariance matrix `S`.
+
+    *symbols* is the sequence of symbols in *expr* and *values* a
+    sequence of the same length holding a float or an array of rows for
+    each symbol.
+
+    *covariance* is the covariance matrix of the inputs, in the order of
+    *symbols*. It may be an array of the shape `(n, n)` if it is the
+    same for all rows, or `(n, n, rows)`.
+
+    Return the tuple `(result, error)` of float arrays.
+    """
+    symbols = list(symbols)
+    values = [np.asarray(value, dtype=np.float64) for value in values]
+    result = sympyUtils.compileExpression(expr, symbols)(*values)
+    jacobian = compile_jacobian(expr, symbols)(*values)
+    covariance = np.asarray(covariance, dtype=np.float64)
+    if covariance.ndim == 2:
+        variance = np.einsum("i...,ij,j...->...", jacobian, covariance, jacobian)
+    else:
+        variance = np.einsum("i...,ij...,j...->...", jacobian, covariance, jacobian)
+    return result, np.sqrt(variance)
+
 def round_to_significant_digits(value, digits, exponent=None):
     if digits == 0:
         raise ValueError("Cannot round to 0 digits")
@@ -136,6 +532,124 @@ def error_rounding(v, dv, force_digits=None):
     fmt_str = "{{:.{digits}f}}".format(digits=fmt_digits)
     return fmt_str.format(v), fmt_str.format(dv)
 
+def _round_half_away(values):
+    """
+    Round the float array *values* to integral values like the builtin
+    :func:`round` of python 2 does, i.e. halfway cases are rounded away
+    from zero.
+    """
+    magnitude = np.abs(values)
+    rounded = np.floor(magnitude)
+    with np.errstate(invalid="ignore"):
+        rounded += (magnitude - rounded) >= 0.5
+    return np.copysign(rounded, values)
+
+def _log10_exponents(values, rounding, fallback):
+    """
+    Return the integer array of *rounding* applied to the decadic
+    logarithm of the non-negative *values*. Where the scalar functions
+    get a *ValueError* from :mod:`math` (zero or nan), *fallback* is
+    used; infinite values raise an *OverflowError* like they do there.
+    """
+    if np.isinf(values).any():
+        raise OverflowError("cannot convert float infinity to integer")
+    with np.errstate(invalid="ignore"):
+        valid = values > 0
+    exponents = rounding(np.log10(np.where(valid, values, 1.))).astype(int)
+    return np.where(valid, exponents, fallback)
+
+def array_round_to_significant_digits(values, digits, exponents=None):
+    """
+    Vectorized variant of :func:`round_to_significant_digits`. *digits*
+    and *exponents* may be integers or integer arrays broadcastable to
+    *values*. Return the tuple of the rounded float array and the
+    integer array of the decimal places to display.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    digits = np.asarray(digits)
+    if (digits == 0).any():
+        raise ValueError("Cannot round to 0 digits")
+    if exponents is None:
+        exponents = _log10_exponents(np.abs(values) / 4, np.floor, 1)
+
+    significant_digits = (digits - exponents) - 1
+    factor = np.power(10., -significant_digits)
+    values = _round_half_away(values / factor) * factor
+    return values, np.maximum(significant_digits, 0)
+
+def format_fixed(values, digits):
+    """
+    Format the one-dimensional float array *values* in fixed point
+    notation with the number of decimal places given by *digits* (an
+    integer or integer array). Values with the same number of decimal
+    places are formatted together. Return the list of strings.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    digits = np.broadcast_to(digits, values.shape)
+    result = np.empty(values.shape, dtype=object)
+    for count in np.unique(digits):
+        indices = np.flatnonzero(digits == count)
+        fmt = "{{:.{}f}}".format(count).format
+        result[indices] = list(map(fmt, values[indices].tolist()))
+    return result.tolist()
+
+def array_digit_rounding(values, digits):
+    """
+    Vectorized variant of :func:`digit_rounding` for a one-dimensional
+    array of *values*. Return the list of strings.
+    """
+    if digits is None:
+        return list(map("{}".format, values))
+    values, fmt_digits = array_round_to_significant_digits(values, digits)
+    return format_fixed(values, fmt_digits)
+
+def array_error_rounding(values, errors, force_digits=None):
+    """
+    Vectorized variant of :func:`error_rounding` for one-dimensional
+    arrays of *values* and their uncertainties *errors*. The exponents,
+    significant digits and decimal places are worked out for all rows
+    at once and give exactly the strings of the scalar function.
+
+    Return a tuple of two lists of strings, one for the values and one
+    for the uncertainties.
+    """
+    values, (errors,) = array_multi_error_rounding(values, [errors], force_digits)
+    return values, errors
+
+def array_multi_error_rounding(values, errors, force_digits=None):
+    """
+    Like :func:`array_error_rounding`, but for a sequence *errors* of
+    several uncertainty arrays on *values* (e.g. statistical and
+    systematic). Each row is rounded according to its smallest non-zero
+    uncertainty and all uncertainties are shown with the decimal places
+    of the value.
+
+    Return a tuple of the list of value strings and a list with one list
+    of strings per uncertainty array.
+    """
+    arrays = np.broadcast_arrays(
+        np.asarray(values, dtype=np.float64),
+        *[np.asarray(error, dtype=np.float64) for error in errors])
+    values, errors = arrays[0], arrays[1:]
+    magnitudes = np.abs(errors)
+    with np.errstate(invalid="ignore"):
+        magnitudes[~(magnitudes > 0)] = np.inf
+    reference = magnitudes.min(axis=0)
+    reference[np.isinf(reference)] = 0
+    err_exponents = _log10_exponents(reference / 4, np.floor, 1)
+    v_exponents = _log10_exponents(np.abs(values), np.ceil, err_exponents)
+
+    if force_digits is None:
+        digits = (v_exponents - err_exponents) + 1
+        digits[digits < 0] = 2
+    else:
+        digits = int(force_digits)
+
+    values, fmt_digits = array_round_to_significant_digits(values, digits, v_exponents)
+    return format_fixed(values, fmt_digits), [
+        format_fixed(array_round_to_significant_digits(error, digits, v_exponents)[0], fmt_digits)
+        for error in errors]
+
 def siunitx_number(vdv):
     """
     Take a tuple (*v*, *dv*) and format it as siunitx number *v* with
@@ -18,8 +18,27 @@ import sympyUtils
 import StatUtils
 import ValueClasses
 import Column
+import Bootstrap
+import Units
+import Decimation
 from Column import MeasurementColumn, DerivatedColumn, ConstColumn
 
+ColumnExport = collections.namedtuple(
+    "ColumnExport",
+    ["name", "symbol", "unit", "unitExpr", "values", "attachments"])
+"""
+A column exported by :meth:`Table.export`: its name, symbol and unit
+(name and expression) along with the float array of its *values* and an
+ordered dict mapping the attachment keys to their float arrays.
+"""
+
+def attachmentName(key):
+    """
+    Return the name of the attachment kind *key*, e.g.
+    `"StatisticalUncertainty"`.
+    """
+    return getattr(key, "__name__", None) or unicode(key)
+
 class Table(object):
     """
     Maintains a measurement table representation.
@@ -112,7 +131,23 @@ class Table(object):
         Return the new :cls:`DerivatedColumn` object.
         """
         self.symbolAvailable(symbol)
+        cols = self._expressionColumns(expression, unit)
         
+        column = self.add(Column.DerivatedColumn(
+            symbol,
+            unit,
+            cols,
+            expression,
+            defaultMagnitude=defaultMagnitude,
+            **kwargs
+        ))
+        return column
+
+    def _expressionColumns(self, expression, unit):
+        """
+        Return the list of columns referenced in *expression*, after
+        checking that the expression yields the tuple-form *unit*.
+        """
         symbols = set(sympyUtils.iterSymbols(expression))
         try:
             cols = list(map(self.__getitem__, symbols))
@@ -120,6 +155,18 @@ class Table(object):
             raise KeyError("Unknown Symbol used in expression: {0}".format(err))
         
         unitName, unitExpr = unit
+
+        try:
+            dimension = Units.dimensionOf(expression, dict(
+                (col.symbol, Units.parse(col.unitExpr)) for col in cols))
+            if not dimension.isCompatible(Units.parse(unitExpr)):
+                raise ValueError("Unit of expression does not match requested unit.")
+            return cols
+        except Units.DimensionError:
+            raise ValueError("Unit of expression does not match requested unit.")
+        except Units.UnsupportedExpression:
+            # fall back to checking the units with sympy
+            pass
         
         unitSubsDict = dict((col.symbol, col.unitExpr) for col in cols)
         testUnitExpr = expression.subs(unitSubsDict)
@@ -129,16 +176,77 @@ class Table(object):
         
         if not utils.empty(iter(sympyUtils.iterSymbolsAndUnits(testUnitExpr / unitExpr))):
             raise ValueError("Unit of expression does not match requested unit.")
-        
-        column = self.add(Column.DerivatedColumn(
+        return cols
+
+    def bootstrap(self, symbol, unit, expression, resamples=1000, seed=None,
+            processes=1, pool=None, key=ValueClasses.StatisticalUncertainty,
+            confidence=0.6827, **kwargs):
+        """
+        Estimate the value and uncertainty of a quantity derived from
+        the means of other columns by resampling the rows of the source
+        columns (see :mod:`Bootstrap`), instead of using gaussian error
+        propagation.
+
+        *symbol*, *unit* and *expression* work like in :meth:`derivate`.
+        The expression is evaluated on the means of the resampled
+        columns. *resamples*, *seed*, *processes*, *pool* and
+        *confidence* are passed to :func:`Bootstrap.bootstrap`; by
+        default, no worker processes are used.
+
+        The result is added to the table as :cls:`ConstColumn` with the
+        standard deviation of the resampled results attached under
+        *key*.
+
+        Return the tuple `(column, result)` of the new column and the
+        :class:`Bootstrap.BootstrapResult`.
+        """
+        self.symbolAvailable(symbol)
+        cols = self._expressionColumns(expression, unit)
+        updated = set()
+        for col in cols:
+            self._updateNode(col, updated)
+
+        unitName, unitExpr = unit
+        unitfreeExpr = Column.numericExpression(expression, cols, unitExpr)
+        result = Bootstrap.bootstrap(
+            Bootstrap.ExpressionStatistic(unitfreeExpr, [col.symbol for col in cols]),
+            [col.dataArray() for col in cols],
+            resamples=resamples,
+            seed=seed,
+            processes=processes,
+            pool=pool,
+            confidence=confidence)
+        column = self.const(
             symbol,
             unit,
-            cols,
-            expression,
-            defaultMagnitude=defaultMagnitude,
-            **kwargs
-        ))
-        return column
+            float(result.value) * unitExpr,
+            {key: float(result.error) * unitExpr},
+            length=len(cols[0]),
+            **kwargs)
+        return column, result
+
+    def convert(self, symbol_or_name, unit, newSymbol=None, inPlace=False):
+        """
+        Convert the column with the given symbol or name into the
+        compatible *unit*, see :meth:`Column.Column.convert`.
+
+        If *inPlace* is *True*, the column is converted in place and
+        columns derivated from it keep working, as they use the unit of
+        their sources. Otherwise, the converted copy is added to the
+        table as :cls:`MeasurementColumn` with the symbol *newSymbol*.
+
+        Return the converted column.
+        """
+        column = self[symbol_or_name]
+        if not inPlace:
+            if newSymbol is None:
+                raise ValueError("A new symbol is required unless converting in place")
+            self.symbolAvailable(newSymbol)
+        self._updateNode(column, set())
+        converted = column.convert(unit, inPlace=inPlace, symbol=newSymbol)
+        if not inPlace:
+            self.add(converted)
+        return converted
 
     def diff(self, symbol_or_name, newSymbol, offset=1, add=True):
         """
@@ -170,7 +278,8 @@ class Table(object):
             (oldColumn.unit, oldColumn.unitExpr),
             newData,
             magnitude=oldColumn.magnitude,
-            noUnits=True
+            noUnits=True,
+            numeric=oldColumn.numeric
         )
         if add:
             self.add(column)
@@ -203,21 +312,24 @@ class Table(object):
             (oldColumn.unit, oldColumn.unitExpr),
             newData,
             magnitude=oldColumn.magnitude,
-            noUnits=True
+            noUnits=True,
+            numeric=oldColumn.numeric
         )
         if add:
             self.add(column)
         return column
 
-    def join(self, newSymbol, args, propagateSystematical=False, addError=0, newUnit=None):
+    def join(self, newSymbol, args, propagateSystematical=False,
+            propagateStatistical=False, addError=0, newUnit=None):
         """
         Joins several columns with similar content together. The cells
         of each row are joined together column-wise by calculating the
         mean. The statistical error gained from that is attached in the
         result column.
 
-        Any uncertainty attachment on the source columns is **not**
-        propagated for now.
+        The join is computed as one array reduction over all source
+        columns (see :func:`StatUtils.array_mean`), so any number of
+        columns can be joined cheaply.
 
         *addError* can be used to add a constant value to the estimated
         error calculated from the statistical operation.
@@ -227,6 +339,11 @@ class Table(object):
         source columns. These are just averaged together and attached
         to the new column.
 
+        *propagateStatistical* can be set to *True* to propagate the
+        statistical uncertainties attached to the source columns through
+        the mean. The propagated uncertainty is added in quadrature to
+        the statistical error of the mean.
+
         Returns the new :cls:`MeasurementColumn` object.
         """
         sources = list(map(self.__getitem__, args))
@@ -237,26 +354,224 @@ class Table(object):
                 source.update()
         column = Column.MeasurementColumn(
             newSymbol,
-            (args[0].unit, args[0].unitExpr)
+            (sources[0].unit, sources[0].unitExpr),
+            numeric=all(source.numeric for source in sources)
         )
         column.newAttachment(ValueClasses.StatisticalUncertainty, default=0)
         if propagateSystematical:
             column.newAttachment(ValueClasses.SystematicalUncertainty, default=0)
-        for cells in itertools.izip(*args):
-            values = list(map(lambda x: x[0], cells))
-            mean, stddev = StatUtils.mean(values)
-            attachmentDict = {}
-            if propagateSystematical:
-                syst = []
-                for value, attachment in cells:
-                    currSyst = attachment.get(ValueClasses.SystematicalUncertainty, None)
-                    if currSyst is not None:
-                        syst.append(currSyst)
-                if len(syst) > 0:
-                    attachmentDict[ValueClasses.SystematicalUncertainty] = sum(syst) / len(syst)
-            attachmentDict[ValueClasses.StatisticalUncertainty] = stddev + addError
-            column._append(mean, attachmentDict)
+
+        values = np.vstack([source.dataArray() for source in sources])
+        mean, stddev = StatUtils.array_mean(values, axis=0)
+        attachments = {}
+
+        if propagateStatistical:
+            errors = self._stackAttachments(sources, ValueClasses.StatisticalUncertainty)
+            if errors is not None:
+                stddev = np.sqrt(stddev**2 + (errors**2).sum(axis=0) / len(sources)**2)
+        attachments[ValueClasses.StatisticalUncertainty] = stddev + addError
+
+        if propagateSystematical:
+            syst = self._stackAttachments(sources, ValueClasses.SystematicalUncertainty)
+            if syst is not None:
+                attachments[ValueClasses.SystematicalUncertainty] = syst.mean(axis=0)
+
+        column.rawExtend(mean, attachments)
         self.add(column)
+        return column
+
+    def combine(self, newSymbol, args, key=ValueClasses.StatisticalUncertainty, scale=False):
+        """
+        Combines several columns holding independent determinations of
+        the same quantity into their inverse-variance weighted mean,
+        row by row. The uncertainties are taken from the attachment
+        *key* which must be declared in all source columns, and the
+        uncertainty of the weighted mean is attached to the result
+        column under the same key. The result is given in the unit of
+        the first source column.
+
+        If *scale* is *True*, the uncertainty of each row is scaled by
+        the Birge ratio of that row if it is larger than one.
+
+        Returns the new :cls:`MeasurementColumn` object.
+        """
+        sources = list(map(self.__getitem__, args))
+        if len(args) < 2:
+            raise ValueError("Combine must have at least two columns to combine")
+        for source in sources:
+            if len(source) == 0:
+                source.update()
+            if key not in source.attachments:
+                raise KeyError("Column {0} has no attachment {1}".format(source.symbol, key))
+        column = Column.MeasurementColumn(
+            newSymbol,
+            (sources[0].unit, sources[0].unitExpr),
+            numeric=all(source.numeric for source in sources)
+        )
+        column.newAttachment(key, default=0)
+        factors = np.array([
+            [Column.conversionFactor(source.unitExpr, column.unitExpr)]
+            for source in sources])
+        result = StatUtils.weighted_mean(
+            np.vstack([source.dataArray() for source in sources]) * factors,
+            self._stackAttachments(sources, key) * factors,
+            axis=0,
+            scale=scale)
+        column.rawExtend(result.mean, {key: result.error})
+        self.add(column)
+        return column
+
+    @staticmethod
+    def _stackAttachments(sources, key):
+        """
+        Stack the *key* attachments of all *sources* which declare it
+        into a two-dimensional array with one row per source. Return
+        *None* if no source declares the attachment.
+        """
+        rows = [source.attachmentArray(key)
+                for source in sources
+                if key in source.attachments]
+        if not rows:
+            return None
+        return np.vstack(rows)
+
+    def select(self, mask, columnKeys=None):
+        """
+        Create a new table which contains only the rows for which the
+        boolean array-like *mask* is *True*.
+
+        *columnKeys* may be an iterable of symbols or names to restrict
+        the new table to these columns. By default, all columns are
+        taken over. All columns of the new table are
+        :cls:`MeasurementColumn` objects holding a copy of the selected
+        rows, including all attachments.
+
+        Return the new :cls:`Table` object.
+        """
+        if columnKeys is None:
+            sources = list(self.columns.itervalues())
+        else:
+            sources = list(map(self.__getitem__, columnKeys))
+        updated = set()
+        for source in sources:
+            self._updateNode(source, updated)
+
+        mask = np.asarray(mask, dtype=bool)
+        indices = np.flatnonzero(mask).tolist()
+        columns = []
+        for source in sources:
+            if len(source) != len(mask):
+                raise ValueError("Mask length does not match length of column {0}".format(source.symbol))
+            values, attachments = source.take(indices)
+            column = Column.MeasurementColumn(
+                source.symbol,
+                (source.unit, source.unitExpr),
+                magnitude=source.magnitude,
+                numeric=source.numeric
+            )
+            for key in attachments:
+                column.newAttachment(key, default=0)
+            column.rawExtend(values, attachments)
+            columns.append(column)
+        return type(self)(columns=columns)
+
+    def sigmaClip(self, symbol_or_name, nsigma=3, maxiters=5, center="median", columnKeys=None):
+        """
+        Reject the rows in which the column identified by
+        *symbol_or_name* holds outliers, using
+        :meth:`Column.sigmaClip`.
+
+        Return the tuple `(table, result)`, where *table* is a new table
+        with only the kept rows (see :meth:`select` for *columnKeys*)
+        and *result* the :class:`StatUtils.SigmaClip` tuple with the row
+        mask and the statistics of the kept values.
+        """
+        column = self[symbol_or_name]
+        self._updateNode(column, set())
+        result = column.sigmaClip(nsigma=nsigma, maxiters=maxiters, center=center)
+        return self.select(result.mask, columnKeys=columnKeys), result
+
+    def decimate(self, xKey, yKey, count, method="lttb", columnKeys=None):
+        """
+        Reduce the table to about *count* rows for plotting the column
+        *yKey* over *xKey*, keeping the rows chosen by
+        :func:`Decimation.decimate` with *method* (e.g. `"lttb"` or
+        `"minmax"`). The attachments of the kept rows are kept along.
+
+        Return a new table with the kept rows, see :meth:`select` for
+        *columnKeys*.
+        """
+        xColumn, yColumn = self[xKey], self[yKey]
+        updated = set()
+        self._updateNode(xColumn, updated)
+        self._updateNode(yColumn, updated)
+        indices = Decimation.decimate(
+            xColumn.dataArray(), yColumn.dataArray(), count, method=method)
+        mask = np.zeros(min(len(xColumn), len(yColumn)), dtype=bool)
+        mask[indices] = True
+        return self.select(mask, columnKeys=columnKeys)
+
+    def export(self, columnKeys=None):
+        """
+        Return the columns *columnKeys* (by default, all columns ordered
+        by name) as :class:`collections.OrderedDict` mapping the column
+        names to :class:`ColumnExport` tuples, for handing the data to
+        other array based tools.
+
+        The arrays of numeric columns share the memory of the columns
+        and are not copied; they are invalidated by appending to the
+        column. Exact columns are converted to float arrays.
+        """
+        if columnKeys is None:
+            columnKeys = sorted(self.symbolNames)
+        columns = list(map(self.__getitem__, columnKeys))
+        updated = set()
+        for column in columns:
+            self._updateNode(column, updated)
+
+        exports = collections.OrderedDict()
+        for column in columns:
+            name = unicode(column.symbol)
+            exports[name] = ColumnExport(
+                name,
+                column.symbol,
+                column.unit,
+                column.unitExpr,
+                column.dataArray(),
+                collections.OrderedDict(
+                    (key, column.attachmentArray(key))
+                    for key in sorted(column.attachments, key=attachmentName)))
+        return exports
+
+    def toDataFrame(self, columnKeys=None):
+        """
+        Return the columns *columnKeys* (see :meth:`export`) as
+        :class:`pandas.DataFrame`, with one data column per column and
+        one per attachment, named `name:kind` (see
+        :func:`attachmentName`). Requires pandas, which may copy the
+        arrays when building the frame.
+
+        If the pandas version supports it, the `attrs` of the frame map
+        each column name to a dict with the *symbol*, the *unit* and the
+        names of the *attachments* of the column.
+        """
+        import pandas
+
+        exports = self.export(columnKeys)
+        data = collections.OrderedDict()
+        for name, export in exports.iteritems():
+            data[name] = export.values
+            for key, values in export.attachments.iteritems():
+                data["{0}:{1}".format(name, attachmentName(key))] = values
+        frame = pandas.DataFrame(data, columns=list(data), copy=False)
+        if hasattr(frame, "attrs"):
+            for name, export in exports.iteritems():
+                frame.attrs[name] = {
+                    "symbol": export.symbol,
+                    "unit": export.unit,
+                    "attachments": list(map(attachmentName, export.attachments)),
+                }
+        return frame
 
     def _updateNode(self, node, updated):
         if node in updated:
@@ -280,11 +595,37 @@ class Table(object):
         """
         updated = set()
         try:
+            self._updateShared(updated)
             for col in self.columns.itervalues():
                 self._updateNode(col, updated)
         except RuntimeError:
             raise ValueError("Stack overflow; Cyclic reference between columns?")
 
+    def _updateShared(self, updated):
+        """
+        Update all derivated columns which can share their calculation
+        (see :meth:`DerivatedColumn.canShare`) level by level in the
+        dependency graph, using :func:`Column.updateShared` for each
+        level.
+        """
+        remaining = set(col for col in self.columns.itervalues()
+                        if isinstance(col, DerivatedColumn) and col.canShare())
+        while remaining:
+            level = [col for col in remaining
+                     if remaining.isdisjoint(col.getSources())]
+            if not level:
+                raise ValueError("Cyclic reference between columns")
+            groups = {}
+            for col in level:
+                for source in col.getSources():
+                    self._updateNode(source, updated)
+                length = len(next(iter(col.getSources())))
+                groups.setdefault(length, []).append(col)
+            for group in groups.itervalues():
+                Column.updateShared(group)
+            updated.update(level)
+            remaining.difference_update(level)
+
     def __getitem__(self, symbol_or_name):
         if isinstance(symbol_or_name, Column.Column):
             return self[symbol_or_name.symbol]
@@ -21,7 +21,22 @@ def split_header_field(field):
         name, unit = splitted
     return name, unit
 
-def ParseCSV(data, cols=None, dialect=None):
+def appendField(col, field):
+    """
+    Append the number in the string *field*, which is given in units of
+    the column, to the column *col*. For numeric columns, the number is
+    appended as float without involving sympy.
+    """
+    if col.numeric:
+        col.rawAppend(float(field))
+        return
+    try:
+        dataItemAsNumber = int(field)
+    except ValueError:
+        dataItemAsNumber = float(field)
+    col.append(dataItemAsNumber * col.unitExpr)
+
+def ParseCSV(data, cols=None, dialect=None, numeric=True):
     """
     Parse a data file in the csv format.
 
@@ -33,6 +48,9 @@ def ParseCSV(data, cols=None, dialect=None):
 
     *dialect* is passed to the `csv.reader` constructor as dialect
      argument.
+
+    *numeric* determines whether generated columns are numeric (see
+    :class:`Column.Column`). Set it to *False* to get exact columns.
     """
     # only handle the first line different if no cols are given
     first = cols is None
@@ -40,24 +58,20 @@ def ParseCSV(data, cols=None, dialect=None):
         if first:
             for field in fields:
                 name, unit = split_header_field(field)
-                cols.append(Column.MeasurementColumn(sympy.Symbol(name), unit))
+                cols.append(Column.MeasurementColumn(sympy.Symbol(name), unit,
+                    numeric=numeric))
         else:
             if len(fields) != len(cols):
                 raise Error('Invalid Table: Incorrect number of columns')
 
             for col, field in zip(cols, fields):
-                try:
-                    dataItemAsNumber = int(field)
-                except ValueError:
-                    dataItemAsNumber = float(field)
-
-                col.appendRow(dataItemAsNumber * col.unitExpr)
+                appendField(col, field)
 
         first = False
     return cols
 
 def ParseGnuplot(data, cols=None, annotation='%', header_sep=None,
-        force_header=False):
+        force_header=False, numeric=True):
     """
     Parse a data file in the gnuplot format with additional
     annotations for column names and units. Return the list of
@@ -78,6 +92,9 @@ def ParseGnuplot(data, cols=None, annotation='%', header_sep=None,
      unit annotation. The default is `None`, so split is on any
      whitespace.
 
+    *numeric* determines whether generated columns are numeric (see
+    :class:`Column.Column`). Set it to *False* to get exact columns.
+
      A table could look like:
 
          #% t/s x/m
@@ -106,7 +123,8 @@ def ParseGnuplot(data, cols=None, annotation='%', header_sep=None,
                 fields = (x for x in line.strip().split(header_sep) if x)
                 for field in fields:
                     name, unit = split_header_field(field)
-                    cols.append(Column.MeasurementColumn(sympy.Symbol(name), unit, []))
+                    cols.append(Column.MeasurementColumn(sympy.Symbol(name), unit, [],
+                        numeric=numeric))
 
             continue
 
@@ -117,11 +135,6 @@ def ParseGnuplot(data, cols=None, annotation='%', header_sep=None,
                 raise Error('Invalid Table: Incorrect number of columns')
 
             for col, field in zip(cols, fields):
-                try:
-                    dataItemAsNumber = int(field)
-                except ValueError:
-                    dataItemAsNumber = float(field)
-
-                col.append(dataItemAsNumber * col.unitExpr)
+                appendField(col, field)
 
     return cols
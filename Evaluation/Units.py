@@ -0,0 +1,235 @@
+# encoding=utf-8
+"""
+Fast dimensional analysis for unit expressions of
+:mod:`sympy.physics.units`.
+
+A unit is represented compactly as :class:`UnitVector`, a scale factor
+and a vector of exponents over the SI base units. Parsed units are
+cached, so that unit validation, conversion and display work without
+any sympy algebra after a unit has been seen once.
+"""
+from __future__ import unicode_literals, division, print_function
+from our_future import *
+
+import fractions
+
+import sympy as sp
+import sympy.physics.units as units
+
+BASE_UNITS = ("m", "kg", "s", "A", "K", "mol", "cd")
+"""Abbreviations of the SI base units, in the order of the exponents."""
+
+_baseIndices = dict((abbrev, i) for i, abbrev in enumerate(BASE_UNITS))
+
+
+class DimensionError(ValueError):
+    """
+    Raised if an expression is not dimensionally consistent or units are
+    not compatible.
+    """
+
+
+class UnsupportedExpression(Exception):
+    """
+    Raised by :func:`dimensionOf` for expressions it cannot analyse.
+    """
+
+
+class UnitVector(object):
+    """
+    A unit as product of the float *scale* and the SI base units raised
+    to *exponents*, a tuple with one (integer or rational) exponent per
+    entry of :data:`BASE_UNITS`.
+    """
+    __slots__ = ("scale", "exponents")
+
+    def __init__(self, scale=1.0, exponents=(0,) * len(BASE_UNITS)):
+        self.scale = scale
+        self.exponents = tuple(exponents)
+
+    @classmethod
+    def base(cls, abbrev):
+        exponents = [0] * len(BASE_UNITS)
+        exponents[_baseIndices[abbrev]] = 1
+        return cls(1.0, exponents)
+
+    def __mul__(self, other):
+        return UnitVector(
+            self.scale * other.scale,
+            (a + b for a, b in zip(self.exponents, other.exponents)))
+
+    def __truediv__(self, other):
+        return UnitVector(
+            self.scale / other.scale,
+            (a - b for a, b in zip(self.exponents, other.exponents)))
+
+    __div__ = __truediv__
+
+    def __pow__(self, exponent):
+        return UnitVector(
+            self.scale ** float(exponent),
+            (a * exponent for a in self.exponents))
+
+    def __eq__(self, other):
+        return (isinstance(other, UnitVector) and
+                (self.scale, self.exponents) == (other.scale, other.exponents))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.scale, self.exponents))
+
+    def isDimensionless(self):
+        return not any(self.exponents)
+
+    def isCompatible(self, other):
+        """
+        Return whether the unit has the same dimension as *other*.
+        """
+        return self.exponents == other.exponents
+
+    def conversionFactor(self, other):
+        """
+        Return the factor which converts values in this unit into values
+        in the unit *other*. Raises a :class:`DimensionError` if the
+        units are not compatible.
+        """
+        if not self.isCompatible(other):
+            raise DimensionError("Unit {0} is not compatible with {1}".format(self, other))
+        return self.scale / other.scale
+
+    def toExpr(self):
+        """
+        Return the unit as sympy expression of the scale and the base
+        units of :mod:`sympy.physics.units`.
+        """
+        expr = sp.S.One if self.scale == 1 else sp.Float(self.scale)
+        for abbrev, exponent in zip(BASE_UNITS, self.exponents):
+            if exponent:
+                expr *= getattr(units, abbrev) ** sp.Rational(exponent.numerator, exponent.denominator)
+        return expr
+
+    def __unicode__(self):
+        parts = []
+        if self.scale != 1 or not any(self.exponents):
+            parts.append("{0!r}".format(self.scale))
+        for abbrev, exponent in zip(BASE_UNITS, self.exponents):
+            if exponent == 1:
+                parts.append(abbrev)
+            elif exponent:
+                fmt = "{0}**{1}" if exponent == int(exponent) else "{0}**({1})"
+                parts.append(fmt.format(abbrev, exponent))
+        return "*".join(parts)
+
+    def __str__(self):
+        return unicode(self).encode("utf-8")
+
+    def __repr__(self):
+        return str("<UnitVector {0}>").format(self)
+
+
+DIMENSIONLESS = UnitVector()
+
+_unitStrings = {}
+_unitVectors = {}
+
+def _exponent(number):
+    if number.is_Integer:
+        return int(number)
+    if number.is_Rational:
+        return fractions.Fraction(int(number.p), int(number.q))
+    raise UnsupportedExpression("Non-rational exponent: {0}".format(number))
+
+def parseString(unit):
+    """
+    Evaluate the unit string *unit* using the identifiers declared in
+    :mod:`sympy.physics.units` and return the sympy expression. Results
+    are cached.
+    """
+    try:
+        return _unitStrings[unit]
+    except KeyError:
+        expr = eval(unicode(unit), units.__dict__)
+        _unitStrings[unit] = expr
+        return expr
+
+def parse(unit):
+    """
+    Return the :class:`UnitVector` of the sympy unit expression (or unit
+    string) *unit*. Results are cached.
+    """
+    if isinstance(unit, (unicode, str)):
+        unit = parseString(unit)
+    try:
+        return _unitVectors[unit]
+    except KeyError:
+        vector = _parse(sp.sympify(unit))
+        _unitVectors[unit] = vector
+        return vector
+
+def _parse(expr):
+    if isinstance(expr, units.Unit):
+        try:
+            return UnitVector.base(expr.abbrev)
+        except KeyError:
+            raise UnsupportedExpression("Unknown unit: {0}".format(expr))
+    if expr.is_Number or expr.is_NumberSymbol:
+        return UnitVector(float(expr))
+    if expr.is_Mul:
+        result = DIMENSIONLESS
+        for arg in expr.args:
+            result = result * _parse(arg)
+        return result
+    if expr.is_Pow:
+        base, exponent = expr.args
+        return _parse(base) ** _exponent(exponent)
+    raise UnsupportedExpression("Not a unit expression: {0}".format(expr))
+
+def dimensionOf(expr, symbols):
+    """
+    Determine the dimension of the sympy expression *expr*, in which the
+    symbols are mapped to their :class:`UnitVector` by the dict
+    *symbols*. Return a :class:`UnitVector` whose scale is always one,
+    as the scale of a sum is not defined.
+
+    Raises a :class:`DimensionError` if the expression is not
+    dimensionally consistent (e.g. if two terms of a sum have different
+    dimensions or a function is applied to a value with a dimension),
+    a *KeyError* for unknown symbols and :class:`UnsupportedExpression`
+    for expressions which cannot be analysed.
+    """
+    if isinstance(expr, units.Unit):
+        return UnitVector(1.0, _parse(expr).exponents)
+    if expr.is_Symbol:
+        return UnitVector(1.0, symbols[expr].exponents)
+    if expr.is_Number or expr.is_NumberSymbol or expr is sp.I:
+        return DIMENSIONLESS
+    if expr.is_Add:
+        args = iter(expr.args)
+        result = dimensionOf(next(args), symbols)
+        for arg in args:
+            if not dimensionOf(arg, symbols).isCompatible(result):
+                raise DimensionError("Terms of {0} have different dimensions".format(expr))
+        return result
+    if expr.is_Mul:
+        result = DIMENSIONLESS
+        for arg in expr.args:
+            result = result * dimensionOf(arg, symbols)
+        return result
+    if expr.is_Pow:
+        base, exponent = expr.args
+        baseDimension = dimensionOf(base, symbols)
+        if baseDimension.isDimensionless():
+            if not dimensionOf(exponent, symbols).isDimensionless():
+                raise DimensionError("Exponent of {0} has a dimension".format(expr))
+            return DIMENSIONLESS
+        return baseDimension ** _exponent(exponent)
+    if isinstance(expr, sp.Abs):
+        return dimensionOf(expr.args[0], symbols)
+    if expr.is_Function:
+        for arg in expr.args:
+            if not dimensionOf(arg, symbols).isDimensionless():
+                raise DimensionError("Argument of {0} has a dimension".format(expr))
+        return DIMENSIONLESS
+    raise UnsupportedExpression("Cannot determine dimension of {0}".format(expr))
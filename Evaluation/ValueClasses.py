@@ -22,3 +22,62 @@ class StatisticalUncertainty(Uncertainty):
 class SystematicalUncertainty(Uncertainty):
     def __unicode__(self):
         return "systematical uncertainty"
+
+class DerivedUncertainty(Uncertainty):
+    """
+    Base class for attachment keys which describe an aspect of another
+    uncertainty *key*. Keys compare equal if they are of the same type
+    and have equal parameters (see :meth:`_parameters`).
+    """
+    def __init__(self, key):
+        self.key = key
+
+    def _parameters(self):
+        return (self.key,)
+
+    def _keyName(self):
+        key = self.key() if isinstance(self.key, type) else self.key
+        return unicode(key)
+
+    def __eq__(self, other):
+        return (type(self) is type(other) and
+                self._parameters() == other._parameters())
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((type(self),) + self._parameters())
+
+
+class Percentile(DerivedUncertainty):
+    """
+    Attachment key for the offset of the *percentile*-th percentile of
+    the distribution of a value from the value itself, as obtained by
+    propagating the uncertainty *key*.
+    """
+    def __init__(self, key, percentile):
+        super(Percentile, self).__init__(key)
+        self.percentile = percentile
+
+    def _parameters(self):
+        return (self.key, self.percentile)
+
+    def __unicode__(self):
+        return "{0}th percentile of {1}".format(self.percentile, self._keyName())
+
+
+class Contribution(DerivedUncertainty):
+    """
+    Attachment key for the contribution of the input *symbol* to the
+    propagated uncertainty *key* of a value.
+    """
+    def __init__(self, key, symbol):
+        super(Contribution, self).__init__(key)
+        self.symbol = symbol
+
+    def _parameters(self):
+        return (self.key, self.symbol)
+
+    def __unicode__(self):
+        return "contribution of {0} to {1}".format(self.symbol, self._keyName())
@@ -0,0 +1,59 @@
+# encoding=utf-8
+from __future__ import division, print_function
+from our_future import *
+
+import unittest
+import multiprocessing
+
+import numpy
+import sympy
+import sympy.physics.units as units
+
+import Bootstrap
+import Column
+import Table
+import ValueClasses
+
+class Resample(unittest.TestCase):
+    def setUp(self):
+        self.data = [numpy.arange(20.0), numpy.arange(20.0) * 2 + 1]
+
+    def test_reproducible(self):
+        statistic = Bootstrap.LinearFitStatistic()
+        first = Bootstrap.resample(statistic, self.data, resamples=50, seed=42, processes=1)
+        second = Bootstrap.resample(statistic, self.data, resamples=50, seed=42, processes=2)
+        self.assertEqual(first.shape, (50, 2))
+        self.assertTrue((first == second).all())
+
+    def test_pool(self):
+        statistic = Bootstrap.LinearFitStatistic()
+        serial = Bootstrap.resample(statistic, self.data, resamples=50, seed=42)
+        pool = multiprocessing.Pool(2)
+        try:
+            pooled = Bootstrap.resample(statistic, self.data, resamples=50, seed=42, pool=pool)
+        finally:
+            pool.close()
+            pool.join()
+        self.assertTrue((serial == pooled).all())
+
+    def test_fit(self):
+        result = Bootstrap.bootstrap(Bootstrap.LinearFitStatistic(), self.data,
+            resamples=20, seed=1, processes=1)
+        self.assertAlmostEqual(result.value[0], 2.0)
+        self.assertAlmostEqual(result.value[1], 1.0)
+        self.assertAlmostEqual(result.error[0], 0.0)
+
+    def test_abstract(self):
+        self.assertRaises(TypeError, Bootstrap.Statistic)
+
+class TableBootstrap(unittest.TestCase):
+    def test_expression(self):
+        x, y = sympy.symbols("x y")
+        table = Table.Table()
+        table.add(Column.MeasurementColumn(x, ("m", units.m),
+            [value*units.m for value in range(10)]))
+        column, result = table.bootstrap(y, ("cm", units.cm), 2*x,
+            resamples=200, seed=3, processes=1)
+        self.assertAlmostEqual(column.value, 900)
+        error = column.attachments[ValueClasses.StatisticalUncertainty]
+        self.assertTrue(0.5 * 183 < error < 1.5 * 183)
@@ -2,6 +2,7 @@
 from __future__ import division, print_function
 from our_future import *
 
+import numpy
 import sympy
 import sympy.physics.units as units
 
@@ -73,3 +74,46 @@ class DerivatedColumn(DataTest):
         self.derivColumn2.update(True)
         finalData = [(value*(units.mile**3)*(units.kilogram/(units.meter**3))*value*units.mile/(units.hour**2) / (units.newton), {}) for value in range(10)]
         self.assertEqual(list(self.derivColumn2), finalData)
+
+class NumericColumn(DataTest):
+    def setUp(self):
+        super(NumericColumn, self).setUp()
+        self.col = Column.MeasurementColumn(
+            self.symbol,
+            ("m", self.unit),
+            self.data,
+            numeric=True
+        )
+
+    def test_storage(self):
+        self.assertIsInstance(self.col.data, Column.FloatBuffer)
+        self.assertEqual(len(self.col), len(self.data))
+        for value, (stored, _) in zip(self.data, self.col):
+            self.assertIsInstance(stored, float)
+            self.assertAlmostEqual(stored, float(value / self.unit))
+        array = self.col.dataArray()
+        self.col.data[0] = 42.
+        self.assertEqual(array[0], 42.)
+
+    def test_array(self):
+        array = numpy.asarray(self.col)
+        self.col.data[0] = 42.
+        self.assertEqual(array[0], 42.)
+        self.assertEqual(numpy.asarray(self.col, dtype=numpy.float32).dtype, numpy.float32)
+
+    def test_derivate(self):
+        area = Column.DerivatedColumn(
+            sympy.Symbol("A"),
+            ("m²", self.unit**2),
+            [self.col],
+            self.symbol**2
+        )
+        self.assertTrue(area.numeric)
+        area.update()
+        self.assertIsInstance(area.data, Column.FloatBuffer)
+        self.assertEqual(area.data[0], 0.)
+        for value, stored in zip(self.col.data[1:], area.data[1:]):
+            self.assertAlmostEqual(stored / value**2, 1.)
+
+    def tearDown(self):
+        del self.col
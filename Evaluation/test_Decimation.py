@@ -0,0 +1,38 @@
+# encoding=utf-8
+import unittest
+
+import numpy
+
+import Decimation
+
+class Decimate(unittest.TestCase):
+    def setUp(self):
+        self.x = numpy.arange(1000, dtype=float)
+        self.y = numpy.sin(self.x / 50.)
+        self.y[617] = 5.
+        self.y[123] = -5.
+
+    def test_lttb(self):
+        indices = Decimation.lttb(self.x, self.y, 50)
+        self.assertEqual(len(indices), 50)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], 999)
+        self.assertTrue(numpy.all(numpy.diff(indices) > 0))
+        self.assertIn(617, indices)
+        self.assertIn(123, indices)
+
+    def test_minmax(self):
+        indices = Decimation.minmax(self.x, self.y, 50)
+        self.assertLessEqual(len(indices), 52)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], 999)
+        self.assertIn(617, indices)
+        self.assertIn(123, indices)
+        kept = self.y[indices]
+        self.assertEqual(kept.max(), self.y.max())
+        self.assertEqual(kept.min(), self.y.min())
+
+    def test_short(self):
+        for method in Decimation.METHODS:
+            self.assertEqual(Decimation.decimate(self.x[:10], self.y[:10], 20, method=method).tolist(), list(range(10)))
+        self.assertRaises(ValueError, Decimation.lttb, self.x, self.y, 2)
@@ -0,0 +1,109 @@
+# encoding=utf-8
+from __future__ import division, print_function
+from our_future import *
+
+import unittest
+
+import numpy
+import sympy
+import sympy.physics.units as units
+
+import Column
+import ErrorPropagation
+import StatUtils
+import ValueClasses
+
+class GaussianPropagation(unittest.TestCase):
+    def setUp(self):
+        self.a, self.b, self.c = sympy.symbols("a b c")
+        self.columns = []
+        for symbol, offset in ((self.a, 1), (self.b, 3)):
+            column = Column.MeasurementColumn(
+                symbol, ("m", units.m), [(value+offset)*units.m for value in range(5)])
+            column.attach(ValueClasses.StatisticalUncertainty, default=0.5)
+            self.columns.append(column)
+
+    def test_exact(self):
+        expr = self.a * self.b**2
+        exact = Column.DerivatedColumn(
+            self.c, ("m³", units.m**3), self.columns, expr)
+        compiled = Column.DerivatedColumn(
+            self.c, ("m³", units.m**3), self.columns, expr,
+            propagation=ErrorPropagation.GaussianPropagation())
+        exact.update()
+        compiled.update()
+        for (value, attachments), (cvalue, cattachments) in zip(exact, compiled):
+            self.assertAlmostEqual(float(value), cvalue)
+            self.assertAlmostEqual(
+                float(attachments[ValueClasses.StatisticalUncertainty]),
+                cattachments[ValueClasses.StatisticalUncertainty])
+
+    def test_covariance(self):
+        propagation = ErrorPropagation.GaussianPropagation(
+            covariance={(self.a, self.b): 0.25*units.m**2})
+        column = Column.DerivatedColumn(
+            self.c, ("m", units.m), self.columns, self.b - self.a,
+            propagation=propagation)
+        column.update()
+        self.assertEqual(column.data, [2.0] * 5)
+        self.assertEqual(
+            column.attachments[ValueClasses.StatisticalUncertainty].data,
+            [0.0] * 5)
+
+    def test_budget(self):
+        column = Column.DerivatedColumn(
+            self.c, ("m²", units.m**2), self.columns, self.a**2 + self.b**2,
+            propagation=ErrorPropagation.GaussianPropagation(budget=True))
+        column.update()
+        # |d(x**2)/dx| * 0.5 = x
+        contribution = ValueClasses.Contribution(
+            ValueClasses.StatisticalUncertainty, self.b)
+        self.assertEqual(column.attachments[contribution].data,
+                         [3.0, 4.0, 5.0, 6.0, 7.0])
+        budget = column.errorBudget()
+        # a: 1 + 4 + 9 + 16 + 25 = 55, b: 9 + 16 + 25 + 36 + 49 = 135
+        self.assertAlmostEqual(budget[self.a], 55 / 190)
+        self.assertAlmostEqual(budget[self.b], 135 / 190)
+
+    def test_matrix(self):
+        x, y = sympy.symbols("x y")
+        result, error = StatUtils.propagate_covariance(
+            x + y, [x, y], [numpy.zeros(3), numpy.ones(3)],
+            [[1.0, -0.5], [-0.5, 1.0]])
+        self.assertEqual(list(result), [1.0] * 3)
+        self.assertEqual(list(error), [1.0] * 3)
+
+    def test_abstract(self):
+        self.assertRaises(TypeError, ErrorPropagation.Propagation)
+
+class MonteCarloPropagation(unittest.TestCase):
+    def setUp(self):
+        self.x, self.y = sympy.symbols("x y")
+        self.source = Column.MeasurementColumn(
+            self.x, ("m", units.m), [value*units.m for value in range(1, 6)])
+        self.source.attach(ValueClasses.StatisticalUncertainty, default=0.1)
+
+    def test_linear(self):
+        propagation = ErrorPropagation.MonteCarloPropagation(
+            samples=20000, seed=1, percentiles=(50,), blockSize=2**12)
+        column = Column.DerivatedColumn(
+            self.y, ("cm", units.cm), [self.source], 3*self.x,
+            propagation=propagation)
+        column.update()
+        self.assertEqual(column.data, [300.0, 600.0, 900.0, 1200.0, 1500.0])
+        for error in column.attachments[ValueClasses.StatisticalUncertainty]:
+            self.assertAlmostEqual(error / 30, 1, places=1)
+        median = ValueClasses.Percentile(ValueClasses.StatisticalUncertainty, 50)
+        for offset in column.attachments[median]:
+            self.assertTrue(abs(offset) < 3)
+
+    def test_seed(self):
+        propagation = ErrorPropagation.MonteCarloPropagation(samples=100, seed=5)
+        results = []
+        for i in range(2):
+            column = Column.DerivatedColumn(
+                self.y, ("m²", units.m**2), [self.source], self.x**2,
+                propagation=propagation)
+            column.update()
+            results.append(column.attachments[ValueClasses.StatisticalUncertainty].data)
+        self.assertEqual(results[0], results[1])
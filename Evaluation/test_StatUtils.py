@@ -2,6 +2,7 @@
 import unittest
 
 import math
+import numpy
 import sympy
 import sympy.physics.units as units
 
@@ -20,4 +21,167 @@ class Mean(unittest.TestCase):
         mean, dev = StatUtils.mean(column.data)
         self.assertEqual(mean, 0.2)
         self.assertEqual(dev, math.sqrt(((0.1**2+0.2**2+0.3**2)/3 - 0.2**2) / 2))
-        
+
+class Accumulator(unittest.TestCase):
+    def setUp(self):
+        self.data = [1e9 + x for x in (4.0, 7.0, 13.0, 16.0)]
+
+    def test_push(self):
+        acc = StatUtils.Accumulator()
+        acc.extend(self.data)
+        self.assertEqual(acc.count, 4)
+        self.assertAlmostEqual(acc.mean, 1e9 + 10.0)
+        self.assertAlmostEqual(acc.variance, 30.0)
+        self.assertIsInstance(acc.result()[0], float)
+
+    def test_few(self):
+        acc = StatUtils.Accumulator()
+        self.assertTrue(math.isnan(acc.variance))
+        self.assertTrue(math.isnan(acc.stddev_of_mean))
+        acc.push(3)
+        self.assertEqual(acc.mean, 3.0)
+        self.assertTrue(math.isnan(acc.variance))
+        self.assertTrue(math.isnan(StatUtils.Accumulator(1, 3, 0).variance))
+        rows = StatUtils.Accumulator()
+        rows.push(numpy.array([1., 2.]))
+        self.assertEqual(rows.variance.shape, (2,))
+        self.assertTrue(numpy.isnan(rows.variance).all())
+
+    def test_merge(self):
+        first, second = StatUtils.Accumulator(), StatUtils.Accumulator()
+        first.extend(self.data[:1])
+        second.extend(self.data[1:])
+        merged = first + second
+        self.assertEqual(merged.count, 4)
+        self.assertAlmostEqual(merged.mean, 1e9 + 10.0)
+        self.assertAlmostEqual(merged.variance, 30.0)
+
+    def test_block(self):
+        acc = StatUtils.Accumulator()
+        acc.push_block(self.data[:2])
+        acc.push_block(self.data[2:])
+        self.assertAlmostEqual(acc.variance, 30.0)
+
+    def test_rows(self):
+        data = numpy.array([[0.1, 0.2, 0.3], [1.0, 2.0, 3.0]])
+        means, devs = StatUtils.array_mean(data)
+        for row, mean, dev in zip(data, means, devs):
+            expMean, expDev = StatUtils.mean(list(row))
+            self.assertAlmostEqual(mean, float(expMean))
+            self.assertAlmostEqual(dev, float(expDev))
+
+class WeightedMean(unittest.TestCase):
+    def test_combine(self):
+        result = StatUtils.weighted_mean([1.0, 2.0], [1.0, 2.0])
+        self.assertAlmostEqual(result.mean, 1.2)
+        self.assertAlmostEqual(result.error, math.sqrt(0.8))
+        self.assertAlmostEqual(result.chi2, 0.2**2 + 0.8**2 / 4)
+        self.assertEqual(result.ndof, 1)
+        self.assertAlmostEqual(result.birge, math.sqrt(result.chi2))
+
+    def test_scale(self):
+        result = StatUtils.weighted_mean([1.0, 3.0], [0.1, 0.1], scale=True)
+        self.assertAlmostEqual(result.birge, 10 * math.sqrt(2))
+        self.assertAlmostEqual(result.error, 0.1 / math.sqrt(2) * result.birge)
+
+    def test_rows(self):
+        values = numpy.array([[1.0, 2.0], [1.0, 1.0]])
+        errors = numpy.array([[1.0, 2.0], [1.0, 1.0]])
+        result = StatUtils.weighted_mean(values, errors, axis=-1)
+        self.assertAlmostEqual(result.mean[0], 1.2)
+        self.assertAlmostEqual(result.mean[1], 1.0)
+        self.assertAlmostEqual(result.chi2[1], 0.0)
+
+    def test_invalidErrors(self):
+        for errors in ([1.0, 0.0], [1.0, -1.0], [1.0, numpy.nan], [1.0, numpy.inf]):
+            self.assertRaises(ValueError, StatUtils.weighted_mean, [1.0, 2.0], errors)
+
+class SigmaClip(unittest.TestCase):
+    def test_outlier(self):
+        values = numpy.concatenate([numpy.tile([9.0, 10.0, 11.0], 10), [100.0, numpy.nan]])
+        result = StatUtils.sigma_clip(values, nsigma=3)
+        self.assertEqual(result.count, 30)
+        self.assertFalse(result.mask[-1])
+        self.assertFalse(result.mask[-2])
+        self.assertTrue(result.mask[:-2].all())
+        self.assertAlmostEqual(result.mean, 10.0)
+        self.assertEqual(result.iterations, 2)
+
+    def test_center(self):
+        self.assertRaises(ValueError, StatUtils.sigma_clip, [1.0, 2.0], center="mode")
+
+class PropagateEvalBatch(unittest.TestCase):
+    def test_batch(self):
+        x, y = sympy.symbols("x y")
+        expr = x * sympy.sin(y)
+        xs, ys = numpy.array([1.0, 2.0, 3.0]), numpy.array([0.1, 0.2, 0.3])
+        results, errors = StatUtils.propagate_eval_batch(
+            expr,
+            [(x, xs, 0.5, units.m), (y, ys, numpy.array([0.01, 0.02, 0.03]), 1)],
+            out_unit=units.cm)
+        for i in range(3):
+            result, error = StatUtils.propagate_eval(
+                expr,
+                [(x, xs[i], 0.5, units.m), (y, ys[i], 0.01*(i+1), 1)])
+            self.assertAlmostEqual(results[i], float(result / units.cm))
+            self.assertAlmostEqual(errors[i], float(error / units.cm))
+
+    def test_unit(self):
+        x = sympy.Symbol("x")
+        self.assertRaises(ValueError, StatUtils.propagate_eval_batch,
+            x, [(x, [1.0], [0.1], units.m)], out_unit=units.s)
+
+class ExpressionCache(unittest.TestCase):
+    def test_lru(self):
+        cache = StatUtils.ExpressionCache(maxsize=2)
+        for key in ("a", "b", "a", "c", "b"):
+            cache.get(key, lambda: key.upper())
+        info = cache.info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 4, 2))
+
+    def test_errorSymbols(self):
+        x, y = sympy.symbols("x y")
+        expr = x**2 * y
+        StatUtils.error_cache.clear()
+        results = []
+        for i in range(2):
+            dx, dy = sympy.Dummy("dx"), sympy.Dummy("dy")
+            error = StatUtils.buildErrorExpression(expr, [(x, dx), (y, dy)])
+            results.append(error.subs({x: 1, y: 2, dx: 0.1, dy: 0.2}))
+            self.assertTrue(error.has(dx) and error.has(dy))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(StatUtils.error_cache.info().hits, 1)
+
+class ArrayRounding(unittest.TestCase):
+    def setUp(self):
+        random = numpy.random.RandomState(0)
+        self.values = numpy.concatenate((
+            random.standard_normal(500) * 10.**random.randint(-6, 6, 500),
+            [0., 0.5, 2.5, -2.5, 0.125, 999.5, float("nan")]))
+        self.errors = numpy.abs(self.values) * 10.**random.randint(-4, -1, len(self.values))
+
+    def test_error_rounding(self):
+        for digits in (None, 2):
+            values, errors = StatUtils.array_error_rounding(
+                self.values, self.errors, force_digits=digits)
+            expected = [StatUtils.error_rounding(v, dv, force_digits=digits)
+                        for v, dv in zip(self.values, self.errors)]
+            self.assertEqual(list(zip(values, errors)), expected)
+
+    def test_multi_error_rounding(self):
+        values, (statistical, systematic) = StatUtils.array_multi_error_rounding(
+            [1.23456, -20.5], [[0.012, 0.5], [0.3, 0.]])
+        self.assertEqual(values, ["1.235", "-20.5"])
+        self.assertEqual(statistical, ["0.012", "0.5"])
+        self.assertEqual(systematic, ["0.300", "0.0"])
+
+    def test_digit_rounding(self):
+        self.assertEqual(
+            StatUtils.array_digit_rounding(self.values, 3),
+            [StatUtils.digit_rounding(v, 3) for v in self.values])
+
+    def test_errors(self):
+        self.assertRaises(OverflowError, StatUtils.array_digit_rounding,
+            numpy.array([1., float("inf")]), 3)
+        self.assertRaises(ValueError, StatUtils.array_error_rounding,
+            numpy.array([0.5]), numpy.array([40.]))
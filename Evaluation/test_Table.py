@@ -3,12 +3,21 @@ from __future__ import division, print_function
 from our_future import *
 
 import unittest
+import math
+
+import numpy
+try:
+    import pandas
+except ImportError:
+    pandas = None
 
 import sympy
 import sympy.physics.units as units
 
 import Column
 import Table
+import ValueClasses
+import ErrorPropagation
 
 class TableTest(unittest.TestCase):
     def setUp(self):
@@ -100,6 +109,174 @@ class TableTest(unittest.TestCase):
         velocity.update(True)
         self.assertEqual(list(velocity), [(1, {})] * 9)
 
+    def test_join(self):
+        x2, x3, joined = sympy.symbols("x2 x3 joined")
+        self.table.add(Column.MeasurementColumn(
+            x2, ("m", units.m), [(value+1)*units.m for value in range(10)]
+        ))
+        self.table.add(Column.MeasurementColumn(
+            x3, ("m", units.m), [(value+2)*units.m for value in range(10)]
+        ))
+        col = self.table.join(joined, [self.lengthSymbol, x2, x3])
+        self.assertEqual(col.data, [value+1.0 for value in range(10)])
+        self.assertEqual(
+            col.attachments[ValueClasses.StatisticalUncertainty].data,
+            [math.sqrt(1/3)] * 10
+        )
+        self.assertIs(self.table[joined], col)
+
+    def test_combine(self):
+        x2, combined = sympy.symbols("x2 combined")
+        self.table[self.lengthSymbol].attach(
+            ValueClasses.StatisticalUncertainty, default=1)
+        x2Column = self.table.add(Column.MeasurementColumn(
+            x2, ("cm", units.cm), [(value*100+30)*units.cm for value in range(10)]
+        ))
+        x2Column.attach(ValueClasses.StatisticalUncertainty, default=100)
+        col = self.table.combine(combined, [self.lengthSymbol, x2])
+        for value, expected in zip(col.data, range(10)):
+            self.assertAlmostEqual(value, expected + 0.15)
+
+        value, attachments, result = Column.combine(
+            [self.table[self.lengthSymbol], x2Column])
+        self.assertAlmostEqual(float(value / units.m), 4.65)
+        self.assertAlmostEqual(result.ndof, 19)
+        const = self.table.const(sympy.Symbol("c"), ("m", units.m),
+                                 value, attachments, length=10)
+        self.assertAlmostEqual(
+            float(const.attachmentArray(ValueClasses.StatisticalUncertainty)[0]),
+            math.sqrt(1/20))
+
+    def test_combineZeroError(self):
+        x2, combined = sympy.symbols("x2 combined")
+        self.table[self.lengthSymbol].attach(
+            ValueClasses.StatisticalUncertainty, default=0)
+        self.table.add(Column.MeasurementColumn(
+            x2, ("m", units.m), self.lengthData
+        )).attach(ValueClasses.StatisticalUncertainty, default=1)
+        self.assertRaises(ValueError,
+            self.table.combine, combined, [self.lengthSymbol, x2])
+
+    def test_sigmaClip(self):
+        noisy = sympy.Symbol("noisy")
+        self.table.add(Column.MeasurementColumn(
+            noisy, ("m", units.m), [value*units.m for value in [1.0] * 9 + [1000.0]]
+        ))
+        table, result = self.table.sigmaClip(noisy, nsigma=2)
+        self.assertEqual(result.count, 9)
+        self.assertEqual(len(table[noisy]), 9)
+        self.assertEqual(table[self.lengthSymbol].data, list(range(9)))
+        self.assertEqual(len(self.table[noisy]), 10)
+
+    def test_decimate(self):
+        length = self.table[self.lengthSymbol]
+        length.attach(ValueClasses.StatisticalUncertainty, default=0.5)
+        table = self.table.decimate(self.lengthSymbol, self.lengthSymbol, 4,
+            columnKeys=[self.lengthSymbol])
+        self.assertEqual(table[self.lengthSymbol].data[0], 0)
+        self.assertEqual(table[self.lengthSymbol].data[-1], 9)
+        self.assertEqual(len(table[self.lengthSymbol]), 4)
+        self.assertEqual(list(table[self.lengthSymbol].attachments[ValueClasses.StatisticalUncertainty]), [0.5] * 4)
+
+    def test_export(self):
+        numeric = Column.MeasurementColumn(sympy.Symbol("y"), ("m", units.m), numeric=True)
+        numeric.attach(ValueClasses.StatisticalUncertainty, default=0.5)
+        numeric.rawExtend([1., 2., 3.])
+        self.table.add(numeric)
+        exports = self.table.export(["y", self.lengthSymbol])
+        self.assertEqual(list(exports), ["y", "x"])
+        export = exports["y"]
+        self.assertEqual((export.symbol, export.unit), (numeric.symbol, "m"))
+        self.assertEqual(list(export.attachments), [ValueClasses.StatisticalUncertainty])
+        numeric.data[0] = 42.
+        self.assertEqual(export.values[0], 42.)
+        self.assertEqual(exports["x"].values.tolist(), list(range(10)))
+        self.assertEqual(Table.attachmentName(ValueClasses.StatisticalUncertainty), "StatisticalUncertainty")
+
+    @unittest.skipUnless(pandas, "requires pandas")
+    def test_toDataFrame(self):
+        length = self.table[self.lengthSymbol]
+        length.attach(ValueClasses.StatisticalUncertainty, default=0.5)
+        frame = self.table.toDataFrame([self.lengthSymbol])
+        self.assertEqual(list(frame.columns), ["x", "x:StatisticalUncertainty"])
+        self.assertEqual(frame["x"].tolist(), list(range(10)))
+        self.assertEqual(frame["x:StatisticalUncertainty"].tolist(), [0.5] * 10)
+        if hasattr(frame, "attrs"):
+            self.assertEqual(frame.attrs["x"], {
+                "symbol": self.lengthSymbol,
+                "unit": "m",
+                "attachments": ["StatisticalUncertainty"],
+            })
+
+    def test_convert(self):
+        length = self.table[self.lengthSymbol]
+        length.attach(ValueClasses.StatisticalUncertainty, default=0.5)
+        centimetres = self.table.convert(self.lengthSymbol, ("cm", units.cm),
+            newSymbol=sympy.Symbol("x_cm"))
+        self.assertIs(self.table["x_cm"], centimetres)
+        self.assertEqual(centimetres.data, [value*100. for value in range(10)])
+        self.assertEqual(list(centimetres.attachments[ValueClasses.StatisticalUncertainty]), [50.] * 10)
+        self.assertEqual(length.data, list(range(10)))
+        self.assertRaises(ValueError, self.table.convert, self.lengthSymbol, "s",
+            newSymbol=sympy.Symbol("x_s"))
+
+        area = sympy.Symbol("A")
+        self.table.derivate(area, ("m**2", units.m**2), self.lengthSymbol**2)
+        converted = self.table.convert(self.lengthSymbol, "km", inPlace=True)
+        self.assertIs(converted, length)
+        self.assertEqual(length.unitExpr, units.km)
+        self.assertAlmostEqual(length.data[3], 0.003)
+        self.assertAlmostEqual(length.attachments[ValueClasses.StatisticalUncertainty].data[3], 0.0005)
+        self.table.updateAll()
+        self.assertAlmostEqual(float(self.table[area].data[3]), 9)
+
+    def test_updateShared(self):
+        phi, a, b, c = sympy.symbols("phi a b c")
+        phiData = numpy.arange(1, 11) * 10.
+        phiColumn = self.table.add(Column.MeasurementColumn(
+            phi, ("deg", 1), list(phiData)))
+        phiColumn.attach(ValueClasses.StatisticalUncertainty, default=0.5)
+        shared = sympy.sin(phi / 180 * sympy.pi)
+        columns = [
+            self.table.derivate(a, ("m", units.m), self.lengthSymbol * shared,
+                propagation=ErrorPropagation.GaussianPropagation()),
+            self.table.derivate(b, ("s", units.s), self.timeSymbol / shared**2,
+                propagation=ErrorPropagation.GaussianPropagation()),
+        ]
+        columns.append(self.table.derivate(c, ("m*s", units.m*units.s), a * b,
+            propagation=ErrorPropagation.GaussianPropagation()))
+        self.table.updateAll()
+
+        x = t = numpy.arange(10.)
+        rad = phiData / 180 * math.pi
+        dphi = 0.5 / 180 * math.pi
+        a, b = x * numpy.sin(rad), t / numpy.sin(rad)**2
+        da = numpy.abs(x * numpy.cos(rad)) * dphi
+        db = numpy.abs(2 * t * numpy.cos(rad) / numpy.sin(rad)**3) * dphi
+        expected = [
+            (a, da),
+            (b, db),
+            (a * b, numpy.sqrt((b * da)**2 + (a * db)**2)),
+        ]
+        for col, (values, errors) in zip(columns, expected):
+            data = list(col.data)
+            attachment = list(col.attachments[ValueClasses.StatisticalUncertainty])
+            numpy.testing.assert_allclose(data, values, rtol=1e-12)
+            numpy.testing.assert_allclose(attachment, errors, rtol=1e-12, atol=1e-15)
+            # calculating each column on its own gives the same result
+            col.update()
+            numpy.testing.assert_allclose(list(col.data), data, rtol=1e-12)
+            numpy.testing.assert_allclose(
+                list(col.attachments[ValueClasses.StatisticalUncertainty]),
+                attachment, rtol=1e-12, atol=1e-15)
+
+    def test_updateSharedWithoutSources(self):
+        d = sympy.Symbol("d")
+        col = self.table.derivate(d, ("m", units.m), 2 * units.m,
+            propagation=ErrorPropagation.GaussianPropagation())
+        self.assertFalse(col.canShare())
+        self.assertRaises(ValueError, self.table.updateAll)
+
     def tearDown(self):
         del self.table
         del self.lengthSymbol, self.lengthData
@@ -39,3 +39,12 @@ class ParseGnuplot(unittest.TestCase):
 
         self.assertEqual(self.cols[0].data, [1.0, 4.0, 7.0])
         self.assertEqual(self.cols[1].data, [1.0, 2.0, 3.0])
+
+    def test_numeric(self):
+        self.assertTrue(all(col.numeric for col in self.cols))
+        exact = tp.ParseGnuplot(b"""
+#% x/m
+1
+""".split(b'\n'), numeric=False)
+        self.assertFalse(exact[0].numeric)
+        self.assertEqual(exact[0].data, [1])
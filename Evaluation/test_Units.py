@@ -0,0 +1,52 @@
+# encoding=utf-8
+from __future__ import division, print_function
+from our_future import *
+
+import unittest
+
+import sympy
+import sympy.physics.units as units
+
+import Units
+
+class Parse(unittest.TestCase):
+    def test_vector(self):
+        newton = Units.parse(units.newton)
+        self.assertEqual(newton.exponents, (1, 1, -2, 0, 0, 0, 0))
+        self.assertEqual(newton.scale, 1.0)
+        self.assertEqual(Units.parse("km/h").exponents, (1, 0, -1, 0, 0, 0, 0))
+
+    def test_conversion(self):
+        factor = Units.parse(units.mile).conversionFactor(Units.parse(units.km))
+        self.assertAlmostEqual(factor, 1.609344)
+        self.assertRaises(Units.DimensionError,
+            Units.parse(units.m).conversionFactor, Units.parse(units.s))
+
+    def test_cache(self):
+        self.assertIs(Units.parseString("m/s"), Units.parseString("m/s"))
+
+    def test_display(self):
+        self.assertEqual(unicode(Units.parse(units.kg / units.m**3)), "m**-3*kg")
+
+class DimensionOf(unittest.TestCase):
+    def setUp(self):
+        self.x, self.t, self.n = sympy.symbols("x t n")
+        self.symbols = {
+            self.x: Units.parse(units.m),
+            self.t: Units.parse(units.s),
+            self.n: Units.parse(1),
+        }
+
+    def test_consistent(self):
+        dimension = Units.dimensionOf(
+            self.x / self.t + 3 * units.km / units.hour * sympy.sin(self.n * sympy.pi),
+            self.symbols)
+        self.assertTrue(dimension.isCompatible(Units.parse(units.m / units.s)))
+        dimension = Units.dimensionOf(sympy.sqrt(self.x**2) * self.n**self.n, self.symbols)
+        self.assertTrue(dimension.isCompatible(Units.parse(units.m)))
+
+    def test_inconsistent(self):
+        self.assertRaises(Units.DimensionError,
+            Units.dimensionOf, self.x + self.t, self.symbols)
+        self.assertRaises(Units.DimensionError,
+            Units.dimensionOf, sympy.exp(self.x), self.symbols)
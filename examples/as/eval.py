@@ -32,7 +32,7 @@ import Evaluation.StatUtils as StatUtils
 from Document.TablePrinter import SimplePrinter
 from Evaluation.ValueClasses import StatisticalUncertainty, SystematicalUncertainty
 import CODATA
-CODATA.patchUnits()
+CODATA.patchUnits(numeric=True)
 
 # setup constant g from previous experiment
 g = 1.536*10**-6*units.m
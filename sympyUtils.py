@@ -1,5 +1,17 @@
+import collections
+
 import sympy as sp
 import sympy.physics.units as u
+import numpy as np
+
+import utils
+from Evaluation import Units
+
+# functions which are not translated to numpy by lambdify itself
+_numpyNamespace = {
+    "Abs": np.absolute,
+    "sign": np.sign,
+}
 
 def iterSubtype(expr, type):
     if isinstance(expr, type):
@@ -18,6 +30,92 @@ def iterUnits(expr):
 def iterSymbolsAndUnits(expr):
     return iterSubtype(expr, (sp.Symbol, u.Unit))
 
+def siDimension(expr):
+    """
+    Return the :class:`Units.UnitVector` of the dimension of *expr*, in
+    which all symbols stand for dimensionless numbers. Raises a
+    *ValueError* if *expr* is not dimensionally consistent and
+    :class:`Units.UnsupportedExpression` if it cannot be analysed.
+    """
+    try:
+        return Units.dimensionOf(
+            expr, collections.defaultdict(lambda: Units.DIMENSIONLESS))
+    except Units.DimensionError as err:
+        raise ValueError("{0} is not dimensionally consistent: {1}".format(expr, err))
+
+def removeUnits(expr):
+    """
+    Replace all units in *expr* by one. For an expression which is
+    unitless as a whole, this yields its plain numeric form, even if
+    sympy did not cancel the units itself. The symbols in *expr* are
+    taken as dimensionless numbers.
+
+    Raises a *ValueError* if *expr* is not dimensionless.
+    """
+    try:
+        dimensionless = siDimension(expr).isDimensionless()
+    except Units.UnsupportedExpression:
+        # fall back to letting sympy cancel the units
+        dimensionless = utils.empty(iterUnits(sp.cancel(expr)))
+    if not dimensionless:
+        raise ValueError("{0} is not dimensionless".format(expr))
+    return expr.subs(dict((unit, 1) for unit in set(iterUnits(expr))))
+
 def setUndefinedTo(expr, value):
     return expr.subs(dict((sym, value) for sym in list(iterSymbols(expr))))
-    
+
+def compileExpression(expr, symbols):
+    """
+    Compile the sympy expression *expr* into a numpy-vectorized
+    function. The function takes one argument per symbol in *symbols*
+    (in that order), which may be floats or numpy arrays, and returns
+    a float array of the broadcast shape of its arguments.
+    """
+    symbols = list(symbols)
+    args = [sp.Symbol(str("__compiled_arg_{0}").format(i)) for i in range(len(symbols))]
+    func = sp.lambdify(
+        args,
+        sp.sympify(expr).subs(zip(symbols, args)),
+        [_numpyNamespace, "numpy"])
+
+    def compiled(*values):
+        result = np.asarray(func(*values), dtype=np.float64)
+        if values:
+            shape = np.broadcast_arrays(*values)[0].shape
+            if result.shape != shape:
+                result = result + np.zeros(shape)
+        return result
+    return compiled
+
+def compileExpressions(exprs, symbols):
+    """
+    Compile several sympy expressions *exprs* into one numpy-vectorized
+    function, like :func:`compileExpression`. Subexpressions which occur
+    more than once are only evaluated once per call (see
+    :func:`sympy.cse`). The function returns the list of float arrays of
+    the results, in the order of *exprs*.
+    """
+    replacements, reduced = sp.cse(
+        list(exprs),
+        symbols=sp.numbered_symbols(cls=sp.Dummy))
+    known = list(symbols)
+
+    def compileStep(expr):
+        indices = [i for i, symbol in enumerate(known) if expr.has(symbol)]
+        return indices, compileExpression(expr, [known[i] for i in indices])
+
+    steps = []
+    for symbol, subexpr in replacements:
+        steps.append(compileStep(subexpr))
+        known.append(symbol)
+    outputs = [compileStep(expr) for expr in reduced]
+
+    def compiled(*values):
+        values = list(values)
+        # broadcasts results which do not depend on all arguments
+        zero = np.zeros(np.broadcast_arrays(*values)[0].shape) if values else 0.
+        for indices, func in steps:
+            values.append(func(*[values[i] for i in indices]) + zero)
+        return [func(*[values[i] for i in indices]) + zero
+                for indices, func in outputs]
+    return compiled
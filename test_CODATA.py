@@ -0,0 +1,29 @@
+from __future__ import unicode_literals, print_function, division
+from our_future import *
+
+import unittest
+
+import sympy.physics.units as units
+
+import CODATA
+
+class Constants(unittest.TestCase):
+    def test_measured(self):
+        me = CODATA.constants["me"]
+        self.assertEqual(me.value, 9.10938215e-31)
+        self.assertEqual(me.uncertainty, 4.5e-38)
+        self.assertEqual(me.quantity / units.kg, me.value)
+
+    def test_derived(self):
+        rydberg = CODATA.constants["rydberg"]
+        self.assertAlmostEqual(rydberg.value, float(CODATA.rydberg * units.m), places=3)
+        self.assertEqual(rydberg.unitExpr, 1/units.m)
+        # CODATA 2006: 10 973 731.568 527(73) m^-1
+        self.assertAlmostEqual(rydberg.value / 10973731.568527, 1, places=9)
+        self.assertEqual(rydberg.uncertainty, 7.3e-5)
+
+    def test_derivedEnergy(self):
+        energy = CODATA.constants["rydberg_energy"]
+        # CODATA 2006: 2.179 871 97(11) x 10^-18 J
+        self.assertAlmostEqual(energy.value / 2.17987197e-18, 1, places=9)
+        self.assertEqual(energy.uncertainty, 1.1e-25)
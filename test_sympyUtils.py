@@ -1,6 +1,7 @@
 # encoding=utf-8
 import unittest
 
+import numpy
 import sympy
 import sympy.physics.units as units
 
@@ -12,3 +13,37 @@ class iterSymbols(unittest.TestCase):
         d = sympy.Dummy("d")
         expr = x**d + y*z - w
         self.assertEqual(set(sympyUtils.iterSymbols(expr)), set((x, y, z, w, d)))
+
+class removeUnits(unittest.TestCase):
+    def test_unitless(self):
+        x = sympy.Symbol("x")
+        self.assertEqual(sympyUtils.removeUnits((x*units.m + x*units.cm) / units.m), 1.01*x)
+
+    def test_dimension(self):
+        x = sympy.Symbol("x")
+        self.assertRaises(ValueError, sympyUtils.removeUnits, x*units.m)
+        self.assertRaises(ValueError, sympyUtils.removeUnits,
+            (x*units.m + x*units.m**2) / units.m**2)
+
+class compileExpression(unittest.TestCase):
+    def test_vectorized(self):
+        x, d = sympy.Symbol("x"), sympy.Dummy("x")
+        func = sympyUtils.compileExpression(abs(x) * d + sympy.Rational(1, 4), [x, d])
+        result = func(numpy.array([-1.0, 2.0]), 2.0)
+        self.assertEqual(list(result), [2.25, 4.25])
+
+    def test_constant(self):
+        x = sympy.Symbol("x")
+        func = sympyUtils.compileExpression(sympy.pi, [x])
+        self.assertEqual(func(numpy.zeros(3)).shape, (3,))
+
+class compileExpressions(unittest.TestCase):
+    def test_shared(self):
+        x, y = sympy.symbols("x y")
+        shared = sympy.sin(x / 180 * sympy.pi)
+        func = sympyUtils.compileExpressions([shared * y, shared**2, sympy.Integer(2)], [x, y])
+        xs, ys = numpy.array([30.0, 90.0]), numpy.array([2.0, 3.0])
+        first, second, third = func(xs, ys)
+        self.assertTrue(numpy.allclose(first, [1.0, 3.0]))
+        self.assertTrue(numpy.allclose(second, [0.25, 1.0]))
+        self.assertEqual(list(third), [2.0, 2.0])
@@ -1,3 +1,11 @@
+import os
+import stat
+import tempfile
+
+# the umask is read once, as setting it is not thread-safe
+_umask = os.umask(0)
+os.umask(_umask)
+
 def empty(iterator):
     try:
         if not hasattr(iterator, "__next__"):
@@ -35,3 +43,40 @@ def intNth(iterable, n=1, offset=0):
         s += item
     if i == n-1:
         yield s
+
+def toList(iterable):
+    """
+    Convert *iterable* into a list. numpy arrays are converted using
+    their :meth:`tolist` method, so that the list contains plain python
+    numbers instead of numpy scalars.
+    """
+    try:
+        return iterable.tolist()
+    except AttributeError:
+        return list(iterable)
+
+def atomicWrite(path, write):
+    """
+    Write the file *path* by calling *write* with a temporary file in
+    the same directory, opened in binary mode, and renaming it to *path*
+    once *write* returned. If *write* raises, the temporary file is
+    removed and *path* is left untouched.
+
+    The file keeps the permissions of an existing *path*; a new file
+    gets the default permissions of the umask, like with :func:`open`.
+    """
+    path = os.path.abspath(path)
+    directory, name = os.path.split(path)
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        mode = 0o666 & ~_umask
+    fd, tmpPath = tempfile.mkstemp(prefix="." + name + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as file:
+            write(file)
+        os.chmod(tmpPath, mode)
+        os.rename(tmpPath, path)
+    except:
+        os.unlink(tmpPath)
+        raise